@@ -0,0 +1,93 @@
+import wave
+from math import gcd
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+from scipy import signal
+
+from audio_processing import LineAudio
+
+MIX_SAMPLE_RATE = 44100
+MIX_CHANNELS = 2
+LEAD_SILENCE = 1.0
+TAIL_SILENCE = 1.0
+LINE_FADE_IN = 0.1
+LINE_FADE_OUT = 0.3
+BGM_VOLUME = 0.1
+BGM_FADE_IN = 1.0
+BGM_FADE_OUT = 3.0
+DUCK_GAIN = 0.4
+DUCK_THRESHOLD = 0.01
+DUCK_DETECT_WINDOW = 0.05
+DUCK_SMOOTHING = 0.25
+
+def resample(samples: np.ndarray, sample_rate: int, target_rate: int = MIX_SAMPLE_RATE) -> np.ndarray:
+    audio = samples.astype(np.float32) / 32768.0
+    if sample_rate == target_rate:
+        return audio
+    divisor = gcd(sample_rate, target_rate)
+    return signal.resample_poly(audio, target_rate // divisor, sample_rate // divisor).astype(np.float32)
+
+def apply_fades(audio: np.ndarray, fade_in: float, fade_out: float, sample_rate: int = MIX_SAMPLE_RATE) -> None:
+    fade_in_len = min(int(fade_in * sample_rate), len(audio))
+    fade_out_len = min(int(fade_out * sample_rate), len(audio))
+    if fade_in_len:
+        audio[:fade_in_len] *= np.linspace(0, 1, fade_in_len, dtype=np.float32).reshape((-1,) + (1,) * (audio.ndim - 1))
+    if fade_out_len:
+        audio[len(audio) - fade_out_len:] *= np.linspace(1, 0, fade_out_len, dtype=np.float32).reshape((-1,) + (1,) * (audio.ndim - 1))
+
+def line_offsets(durations: Sequence[float], sample_rate: int = MIX_SAMPLE_RATE) -> List[int]:
+    return [int(round((LEAD_SILENCE + sum(durations[:i])) * sample_rate)) for i in range(len(durations) + 1)]
+
+def loop_bgm(bgm: np.ndarray, total_frames: int) -> np.ndarray:
+    if len(bgm) >= total_frames:
+        looped = np.array(bgm[:total_frames], dtype=np.float32)
+    else:
+        indices = np.arange(total_frames) % len(bgm)
+        looped = np.asarray(bgm, dtype=np.float32)[indices]
+    looped *= np.float32(BGM_VOLUME / 32768.0)
+    return looped
+
+def moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    cumulative = np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+    starts = np.clip(np.arange(len(values)) - window // 2, 0, len(values))
+    ends = np.minimum(starts + window, len(values))
+    return ((cumulative[ends] - cumulative[starts]) / np.maximum(ends - starts, 1)).astype(np.float32)
+
+def ducking_envelope(voice: np.ndarray, sample_rate: int = MIX_SAMPLE_RATE) -> np.ndarray:
+    level = moving_average(np.abs(voice), max(1, int(DUCK_DETECT_WINDOW * sample_rate)))
+    activity = (level > DUCK_THRESHOLD).astype(np.float32)
+    activity = moving_average(activity, max(1, int(DUCK_SMOOTHING * sample_rate)))
+    return 1 - (1 - DUCK_GAIN) * activity
+
+def mix_soundtrack(lines: Sequence[LineAudio], bgm: Optional[np.ndarray], durations: Optional[Sequence[float]] = None,
+                   duck: bool = False) -> np.ndarray:
+    durations = list(durations) if durations is not None else [line.duration for line in lines]
+    offsets = line_offsets(durations)
+    total_frames = int(round((LEAD_SILENCE + sum(durations) + TAIL_SILENCE) * MIX_SAMPLE_RATE))
+
+    voice = np.zeros(total_frames, dtype=np.float32)
+    for line, start, end in zip(lines, offsets, offsets[1:]):
+        audio = resample(line.samples, line.sample_rate)[:end - start]
+        apply_fades(audio, LINE_FADE_IN, LINE_FADE_OUT)
+        voice[start:start + len(audio)] += audio
+
+    if bgm is None or len(bgm) == 0:
+        mix = np.repeat(voice[:, np.newaxis], MIX_CHANNELS, axis=1)
+    else:
+        mix = loop_bgm(bgm, total_frames)
+        apply_fades(mix, BGM_FADE_IN, BGM_FADE_OUT)
+        if duck:
+            mix *= ducking_envelope(voice)[:, np.newaxis]
+        mix += voice[:, np.newaxis]
+
+    np.clip(mix, -1, 1, out=mix)
+    return mix
+
+def write_mix(mix: np.ndarray, output_file: Union[str, Path], sample_rate: int = MIX_SAMPLE_RATE) -> None:
+    with wave.open(str(output_file), 'wb') as wf:
+        wf.setnchannels(mix.shape[1])
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes((mix * 32767.0).astype(np.int16).tobytes())
@@ -0,0 +1,166 @@
+import io
+import wave
+import threading
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+import numpy as np
+from scipy import signal
+
+SILENCE_PADDING_MS = 300
+STREAM_LOOKAHEAD_MS = 100
+
+class LineAudio(NamedTuple):
+    samples: np.ndarray
+    sample_rate: int
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+    def to_bytes(self) -> bytes:
+        return self.samples.astype(np.int16, copy=False).tobytes()
+
+def decode_wav(audio_data: bytes) -> LineAudio:
+    with wave.open(io.BytesIO(audio_data), 'rb') as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1:
+            raise ValueError("16bitモノラルのWAV以外には対応していません。")
+        sample_rate = wf.getframerate()
+        data = wf.readframes(wf.getnframes())
+    return LineAudio(np.frombuffer(data, dtype=np.int16), sample_rate)
+
+def encode_wav(audio: LineAudio) -> bytes:
+    buffer = io.BytesIO()
+    write_wav(audio, buffer)
+    return buffer.getvalue()
+
+def concatenate_wavs(chunks: List[bytes]) -> bytes:
+    decoded = [decode_wav(chunk) for chunk in chunks]
+    if len({audio.sample_rate for audio in decoded}) != 1:
+        raise ValueError("サンプリングレートの異なる音声は結合できません。")
+    return encode_wav(LineAudio(np.concatenate([audio.samples for audio in decoded]), decoded[0].sample_rate))
+
+def pad_silence(audio: LineAudio, duration_ms: int = SILENCE_PADDING_MS) -> LineAudio:
+    padding = np.zeros(int(audio.sample_rate * duration_ms / 1000), dtype=np.int16)
+    return LineAudio(np.concatenate([audio.samples, padding]), audio.sample_rate)
+
+def write_wav(audio: LineAudio, output_file: Union[str, Path, BinaryIO]) -> None:
+    with wave.open(output_file if hasattr(output_file, 'write') else str(output_file), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(audio.sample_rate)
+        wf.writeframes(audio.to_bytes())
+
+class AudioProcessor:
+    def __init__(self, cutoff: int = 100, threshold: float = 0.01, fade_duration_ms: int = 10,
+                 limit_threshold: float = 0.8, order: int = 4):
+        self.cutoff = cutoff
+        self.threshold = threshold
+        self.fade_duration_ms = fade_duration_ms
+        self.limit_threshold = limit_threshold
+        self.order = order
+        self._filters: Dict[int, np.ndarray] = {}
+        self._fades: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def settings(self) -> Dict[str, float]:
+        return {"cutoff": self.cutoff, "threshold": self.threshold, "fade_duration_ms": self.fade_duration_ms,
+                "limit_threshold": self.limit_threshold, "order": self.order}
+
+    def _sos(self, sample_rate: int) -> np.ndarray:
+        sos = self._filters.get(sample_rate)
+        if sos is None:
+            with self._lock:
+                sos = signal.butter(self.order, self.cutoff / (0.5 * sample_rate), btype='high', analog=False, output='sos')
+                self._filters[sample_rate] = sos = sos.astype(np.float32)
+        return sos
+
+    def _fade(self, sample_rate: int) -> np.ndarray:
+        fade = self._fades.get(sample_rate)
+        if fade is None:
+            with self._lock:
+                fade_duration = int(self.fade_duration_ms * sample_rate / 1000)
+                self._fades[sample_rate] = fade = np.linspace(0, 1, fade_duration, dtype=np.float32)
+        return fade
+
+    def _gate(self, audio: np.ndarray) -> None:
+        quiet = np.abs(audio) <= self.threshold
+        np.multiply(audio, np.float32(0.1), out=audio, where=quiet)
+
+    def _to_int16(self, audio: np.ndarray, gain: float) -> np.ndarray:
+        audio *= np.float32(gain)
+        np.clip(audio, -1, 1, out=audio)
+        audio *= np.float32(32767.0)
+        return audio.astype(np.int16)
+
+    def process(self, samples: np.ndarray, sample_rate: int) -> np.ndarray:
+        audio = samples.astype(np.float32)
+        audio *= np.float32(1 / 32768.0)
+        audio = signal.sosfiltfilt(self._sos(sample_rate), audio).astype(np.float32, copy=False)
+        self._gate(audio)
+
+        fade = self._fade(sample_rate)[:len(audio) // 2]
+        audio[:len(fade)] *= fade
+        audio[len(audio) - len(fade):] *= fade[::-1]
+
+        peak = max(float(audio.max(initial=0.0)), -float(audio.min(initial=0.0)))
+        if peak == 0.0:
+            return np.zeros(len(audio), dtype=np.int16)
+        return self._to_int16(audio, self.limit_threshold / peak)
+
+    def process_audio(self, audio: LineAudio) -> LineAudio:
+        return LineAudio(self.process(audio.samples, audio.sample_rate), audio.sample_rate)
+
+    def process_batch(self, clips: Iterable[LineAudio]) -> List[LineAudio]:
+        return [self.process_audio(clip) for clip in clips]
+
+    def process_stream(self, chunks: Iterable[np.ndarray], sample_rate: int, gain: float = 1.0) -> Iterator[np.ndarray]:
+        sos = self._sos(sample_rate)
+        fade = self._fade(sample_rate)
+        lookahead = max(int(STREAM_LOOKAHEAD_MS * sample_rate / 1000), 2 * len(fade))
+        buffer = np.zeros(0, dtype=np.float32)
+        offset = 0
+        emitted = 0
+
+        for chunk in chunks:
+            audio = chunk.astype(np.float32)
+            audio *= np.float32(1 / 32768.0)
+            buffer = np.concatenate([buffer, audio])
+            end = offset + len(buffer) - lookahead
+            if end <= emitted:
+                continue
+            yield self._stream_block(buffer, offset, emitted, end, None, sos, fade, gain)
+            emitted = end
+            drop = max(0, emitted - lookahead - offset)
+            buffer, offset = buffer[drop:], offset + drop
+
+        total = offset + len(buffer)
+        if total > emitted:
+            yield self._stream_block(buffer, offset, emitted, total, total, sos, fade, gain)
+
+    def _stream_block(self, buffer: np.ndarray, offset: int, start: int, end: int, total: Optional[int],
+                      sos: np.ndarray, fade: np.ndarray, gain: float) -> np.ndarray:
+        audio = signal.sosfiltfilt(sos, buffer).astype(np.float32, copy=False)[start - offset:end - offset]
+        self._gate(audio)
+
+        if total is not None:
+            fade = fade[:total // 2]
+        head = fade[start:end]
+        audio[:len(head)] *= head
+        if total is not None:
+            tail_start = total - len(fade)
+            audio[tail_start - start:] *= fade[::-1]
+        return self._to_int16(audio, gain * self.limit_threshold)
+
+_default_processor = AudioProcessor()
+
+def get_audio_processor() -> AudioProcessor:
+    return _default_processor
+
+def process_line_audio(audio_data: bytes) -> LineAudio:
+    return get_audio_processor().process_audio(pad_silence(decode_wav(audio_data)))
+
+def remove_noise(audio_data: bytes, sample_rate: int, cutoff: int = 100, threshold: float = 0.01,
+                 fade_duration_ms: int = 10, limit_threshold: float = 0.8) -> bytes:
+    processor = AudioProcessor(cutoff, threshold, fade_duration_ms, limit_threshold)
+    return processor.process(np.frombuffer(audio_data, dtype=np.int16), sample_rate).tobytes()
@@ -0,0 +1,114 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple
+
+from main import OUTPUT_DIR, build_parser, clean_output_directory, create_render_pool, create_video
+from synthesis_cache import set_cache_enabled
+
+BATCH_OUTPUT_DIR = Path('output')
+DEFAULT_REPORT = BATCH_OUTPUT_DIR / 'batch_report.json'
+ORIENTATION_FLAGS = {"landscape": [], "vertical": ["--vertical"], "both": ["--both"]}
+JOB_OPTIONS = {"char1": "--char1", "char2": "--char2", "mode": "--mode", "bgm": "--bgm", "renderer": "--renderer"}
+JOB_FLAGS = ["draft", "duck"]
+
+class JobResult(NamedTuple):
+    name: str
+    succeeded: bool
+    elapsed: float
+    outputs: List[str]
+    error: str
+
+def load_manifest(manifest_file: Path) -> List[Dict[str, Any]]:
+    with manifest_file.open('r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    jobs = manifest.get("jobs", []) if isinstance(manifest, dict) else manifest
+    if not isinstance(jobs, list) or not all(isinstance(job, dict) for job in jobs):
+        raise SystemExit("エラー: ジョブ定義はオブジェクトのリストで記述してください。")
+    return jobs
+
+def get_job_name(job: Dict[str, Any], index: int) -> str:
+    return str(job.get("name") or f"job_{index:03d}")
+
+def job_arguments(job: Dict[str, Any], name: str, args: argparse.Namespace) -> List[str]:
+    if "input" not in job:
+        raise ValueError("input (URLまたはファイルパス) が指定されていません。")
+    orientation = job.get("orientation", "landscape")
+    if orientation not in ORIENTATION_FLAGS:
+        raise ValueError(f"orientation は {', '.join(ORIENTATION_FLAGS)} のいずれかを指定してください: {orientation}")
+
+    argv = [str(job["input"]), "--output", str(job.get("output") or BATCH_OUTPUT_DIR / f"{name}.mp4")]
+    argv += ORIENTATION_FLAGS[orientation]
+    for key, option in JOB_OPTIONS.items():
+        if job.get(key) is not None:
+            argv += [option, str(job[key])]
+    argv += [f"--{key}" for key in JOB_FLAGS if job.get(key)]
+    if args.jobs:
+        argv += ["--jobs", str(args.jobs)]
+    return argv
+
+def run_job(job: Dict[str, Any], name: str, args: argparse.Namespace, render_pool) -> JobResult:
+    start = time.perf_counter()
+    try:
+        job_args = build_parser().parse_args(job_arguments(job, name, args))
+        _, output_files = create_video(job_args, render_pool=render_pool)
+    except (Exception, SystemExit) as e:
+        print(f"ジョブ {name} が失敗しました: {e}")
+        return JobResult(name, False, time.perf_counter() - start, [], str(e))
+    return JobResult(name, True, time.perf_counter() - start, [str(path) for path in output_files.values()], "")
+
+def print_report(results: List[JobResult], total: float) -> None:
+    print("\nバッチ処理の結果:")
+    for result in results:
+        status = "成功" if result.succeeded else "失敗"
+        detail = ", ".join(result.outputs) if result.succeeded else result.error
+        print(f"{result.name:<24} {status} {result.elapsed:8.1f}秒  {detail}")
+    succeeded = sum(result.succeeded for result in results)
+    print(f"合計: {succeeded}/{len(results)} 件成功, {total:.1f}秒")
+
+def save_report(results: List[JobResult], total: float, report_file: Path) -> None:
+    report_file.parent.mkdir(parents=True, exist_ok=True)
+    report = {"total_seconds": total, "jobs": [result._asdict() for result in results]}
+    with report_file.open('w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"バッチ処理のレポートを保存しました: {report_file}")
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="複数の対話動画をまとめて生成するスクリプト")
+    parser.add_argument("manifest", help="ジョブ定義ファイル (JSON)")
+    parser.add_argument("-j", "--jobs", type=int, help="VOICEVOXの同時合成数 (デフォルト: 環境変数VOICEVOX_CONCURRENCYまたは4)")
+    parser.add_argument("-w", "--render-workers", type=int, help="テロップ動画を並列に生成するプロセス数 (デフォルト: CPUコア数)")
+    parser.add_argument("--no-cache", action="store_true", help="合成音声キャッシュを使用しない")
+    parser.add_argument("--clean", action="store_true", help="開始前に tmp/ の中間生成物をすべて削除する")
+    parser.add_argument("--report", default=str(DEFAULT_REPORT), help=f"ジョブごとの処理時間の出力先 (デフォルト: {DEFAULT_REPORT})")
+    return parser.parse_args()
+
+def main() -> None:
+    args = parse_arguments()
+    jobs = load_manifest(Path(args.manifest))
+    set_cache_enabled(not args.no_cache)
+    if args.clean:
+        clean_output_directory(OUTPUT_DIR)
+
+    results: List[JobResult] = []
+    start = time.perf_counter()
+    with create_render_pool(args.render_workers) as render_pool:
+        names = set()
+        for index, job in enumerate(jobs, start=1):
+            name = get_job_name(job, index)
+            if name in names:
+                name = f"{name}_{index:03d}"
+            names.add(name)
+            print(f"\n=== ジョブ {index}/{len(jobs)}: {name} ===")
+            results.append(run_job(job, name, args, render_pool))
+    total = time.perf_counter() - start
+
+    print_report(results, total)
+    save_report(results, total, Path(args.report))
+    if not all(result.succeeded for result in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
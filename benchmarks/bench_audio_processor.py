@@ -0,0 +1,84 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import numpy as np
+from scipy import signal
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from audio_processing import AudioProcessor
+
+SAMPLE_RATE = 24000
+CLIP_SECONDS = [1, 3, 5, 10, 15]
+
+def reference_remove_noise(audio_data: bytes, sample_rate: int, cutoff: int = 100, threshold: float = 0.01,
+                           fade_duration_ms: int = 10, limit_threshold: float = 0.8) -> bytes:
+    audio_array = np.frombuffer(audio_data, dtype=np.int16) / 32768.0
+    nyquist = 0.5 * sample_rate
+    normal_cutoff = cutoff / nyquist
+    b, a = signal.butter(4, normal_cutoff, btype='high', analog=False)
+    audio_array = signal.filtfilt(b, a, audio_array)
+    audio_array = np.where(np.abs(audio_array) > threshold, audio_array, audio_array * 0.1)
+
+    fade_duration = int(fade_duration_ms * sample_rate / 1000)
+    fade_in = np.linspace(0, 1, fade_duration)
+    fade_out = np.linspace(1, 0, fade_duration)
+    audio_array[:fade_duration] *= fade_in
+    audio_array[-fade_duration:] *= fade_out
+
+    audio_array = np.clip(audio_array / np.max(np.abs(audio_array)) * limit_threshold, -1, 1)
+    return (audio_array * 32767.0).astype(np.int16).tobytes()
+
+def make_clip(seconds: float, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    voice = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((180, 360, 540, 900)))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2
+    hum = 0.2 * np.sin(2 * np.pi * 50 * t)
+    noise = 0.02 * rng.standard_normal(len(t))
+    audio = (voice * envelope + hum + noise) / 3
+    return (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="remove_noise と AudioProcessor の速度・数値比較")
+    parser.add_argument("-r", "--repeat", type=int, default=10, help="計測回数 (デフォルト: 10)")
+    args = parser.parse_args()
+
+    processor = AudioProcessor()
+    clips: List[np.ndarray] = [make_clip(seconds, seed) for seed, seconds in enumerate(CLIP_SECONDS)]
+
+    print(f"{'長さ':>6} {'従来(ms)':>10} {'新規(ms)':>10} {'速度比':>8} {'最大誤差(LSB)':>14} {'SNR(dB)':>9}")
+    for seconds, clip in zip(CLIP_SECONDS, clips):
+        data = clip.tobytes()
+        reference = np.frombuffer(reference_remove_noise(data, SAMPLE_RATE), dtype=np.int16)
+        result = processor.process(clip, SAMPLE_RATE)
+
+        diff = reference.astype(np.int32) - result.astype(np.int32)
+        error_power = np.mean(diff.astype(np.float64) ** 2)
+        signal_power = np.mean(reference.astype(np.float64) ** 2)
+        snr = 10 * np.log10(signal_power / error_power) if error_power else float('inf')
+
+        reference_time = measure(lambda: reference_remove_noise(data, SAMPLE_RATE), args.repeat)
+        processor_time = measure(lambda: processor.process(clip, SAMPLE_RATE), args.repeat)
+        print(f"{seconds:>5}s {reference_time * 1000:>10.2f} {processor_time * 1000:>10.2f} "
+              f"{reference_time / processor_time:>7.2f}x {int(np.max(np.abs(diff))):>14} {snr:>9.1f}")
+
+    reference_batch = measure(lambda: [reference_remove_noise(clip.tobytes(), SAMPLE_RATE) for clip in clips], args.repeat)
+    processor_batch = measure(lambda: [processor.process(clip, SAMPLE_RATE) for clip in clips], args.repeat)
+    print(f"バッチ({len(clips)}クリップ): 従来 {reference_batch * 1000:.2f}ms / 新規 {processor_batch * 1000:.2f}ms "
+          f"({reference_batch / processor_batch:.2f}x)")
+
+if __name__ == "__main__":
+    main()
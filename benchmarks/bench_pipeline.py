@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from ffmpeg_utils import probe_duration
+from voicevox_stub import StubServer
+
+SCENARIO_DIR = Path(__file__).resolve().parent / 'scenarios'
+SCENARIOS = ["short", "long"]
+ORIENTATIONS = {"landscape": [], "vertical": ["--vertical"]}
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+WORK_DIR = REPO_ROOT / 'tmp' / 'benchmark'
+SYNTHESIS_SPANS = {"plan_synthesis", "synthesis"}
+RENDER_SPANS = {"render_clip", "combine_clips", "render_ffmpeg"}
+METRICS = [("synthesis_lines_per_sec", "合成(行/秒)", True), ("render_fps", "描画(fps)", True),
+           ("wall", "全体(秒)", False), ("peak_rss_mb", "ピークRSS(MB)", False)]
+
+def count_lines(scenario_file: Path) -> int:
+    lines = scenario_file.read_text(encoding='utf-8').strip().split('\n')
+    return sum(1 for line in lines if ':' in line and not line.startswith(("タイトル", "雰囲気")))
+
+def span_window(events: List[Dict[str, Any]], names: set) -> float:
+    spans = [(event["ts"], event["ts"] + event["dur"]) for event in events if event["name"] in names]
+    if not spans:
+        return 0.0
+    return (max(end for _, end in spans) - min(start for start, _ in spans)) / 1e6
+
+def run_case(scenario: str, orientation: str, args: argparse.Namespace, stub_address: str) -> Dict[str, Any]:
+    from generate_movie import get_render_profile
+    case_dir = WORK_DIR / f"{scenario}_{orientation}"
+    trace_dir = case_dir / 'trace'
+    output_file = case_dir / 'output.mp4'
+    scenario_file = SCENARIO_DIR / f"{scenario}.txt"
+
+    command = [sys.executable, str(REPO_ROOT / 'main.py'), str(scenario_file), "--no-cache", "--trace", str(trace_dir),
+               "--output", str(output_file), "--renderer", args.renderer] + ORIENTATIONS[orientation]
+    if args.draft:
+        command.append("--draft")
+    if args.render_workers:
+        command += ["--render-workers", str(args.render_workers)]
+    env = dict(os.environ, VOICEVOX_API_HOST=stub_address, BUILD_CACHE="0", VOICEVOX_CACHE_DIR=str(case_dir / 'cache'))
+    env.pop("VOICEVOX_API_HOSTS", None)
+
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL if args.quiet else None)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"main.py が終了コード {result.returncode} で失敗しました")
+
+    with (trace_dir / 'trace.json').open('r', encoding='utf-8') as f:
+        events = json.load(f)["traceEvents"]
+    with (trace_dir / 'trace_summary.json').open('r', encoding='utf-8') as f:
+        summary = json.load(f)
+
+    lines = count_lines(scenario_file)
+    frames = round(probe_duration(output_file) * get_render_profile(args.draft).fps)
+    synthesis_seconds = span_window(events, SYNTHESIS_SPANS)
+    render_seconds = span_window(events, RENDER_SPANS)
+    peak_rss = max([summary["peak_rss_mb"]] + [span["peak_rss_mb"] for span in summary["spans"].values()])
+    return {
+        "scenario": scenario,
+        "orientation": orientation,
+        "lines": lines,
+        "frames": frames,
+        "wall": wall,
+        "synthesis_seconds": synthesis_seconds,
+        "synthesis_lines_per_sec": lines / synthesis_seconds if synthesis_seconds else 0.0,
+        "render_seconds": render_seconds,
+        "render_fps": frames / render_seconds if render_seconds else 0.0,
+        "peak_rss_mb": peak_rss,
+        "stages": summary["stages"],
+    }
+
+def git_revision() -> Tuple[str, bool]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT, capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit.stdout.strip(), bool(status.stdout.strip())
+
+def case_name(case: Dict[str, Any]) -> str:
+    return f"{case['scenario']}/{case['orientation']}"
+
+def print_results(cases: List[Dict[str, Any]]) -> None:
+    print(f"\n{'ケース':<18} {'行数':>4} {'フレーム':>8} " + " ".join(f"{label:>14}" for _, label, _ in METRICS))
+    for case in cases:
+        print(f"{case_name(case):<18} {case['lines']:>4} {case['frames']:>8} " +
+              " ".join(f"{case[metric]:>14.2f}" for metric, _, _ in METRICS))
+
+def print_comparison(cases: List[Dict[str, Any]], baseline: Dict[str, Any], baseline_file: Path) -> None:
+    previous = {case_name(case): case for case in baseline["cases"]}
+    print(f"\n比較対象: {baseline_file.name} (コミット {baseline['commit']})")
+    for case in cases:
+        base = previous.get(case_name(case))
+        if base is None:
+            continue
+        changes = []
+        for metric, label, higher_is_better in METRICS:
+            if not base[metric]:
+                continue
+            change = (case[metric] - base[metric]) / base[metric] * 100
+            better = change > 0 if higher_is_better else change < 0
+            changes.append(f"{label} {change:+.1f}%{'' if abs(change) < 1 else (' ↑' if better else ' ↓')}")
+        print(f"{case_name(case):<18} " + "  ".join(changes))
+
+def latest_result(settings: Dict[str, Any]) -> Optional[Path]:
+    for result_file in sorted(RESULTS_DIR.glob('*.json'), reverse=True):
+        with result_file.open('r', encoding='utf-8') as f:
+            if json.load(f).get("settings") == settings:
+                return result_file
+    return None
+
+def save_results(result: Dict[str, Any]) -> Path:
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    result_file = RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}_{result['commit']}.json"
+    with result_file.open('w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return result_file
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="VOICEVOXスタブと固定シナリオによるオフラインのパイプラインベンチマーク")
+    parser.add_argument("-s", "--scenario", choices=SCENARIOS, action="append", help="実行するシナリオ (デフォルト: すべて)")
+    parser.add_argument("--orientation", choices=list(ORIENTATIONS), action="append", help="実行する向き (デフォルト: 両方)")
+    parser.add_argument("-r", "--renderer", choices=["moviepy", "ffmpeg"], default="moviepy", help="動画の合成方式 (デフォルト: moviepy)")
+    parser.add_argument("-w", "--render-workers", type=int, help="テロップ動画を並列に生成するプロセス数")
+    parser.add_argument("--draft", action="store_true", help="ドラフト設定で計測する")
+    parser.add_argument("--latency", type=float, default=0.0, help="スタブのリクエストごとの遅延 (秒、デフォルト: 0)")
+    parser.add_argument("--compare", help="比較する結果ファイル (デフォルト: 同じ設定で保存された直近の結果)")
+    parser.add_argument("--no-save", action="store_true", help="結果を保存しない")
+    parser.add_argument("-q", "--quiet", action="store_true", help="main.py の出力を表示しない")
+    args = parser.parse_args()
+
+    settings = {"renderer": args.renderer, "draft": args.draft, "latency": args.latency, "render_workers": args.render_workers}
+    baseline_file = Path(args.compare) if args.compare else latest_result(settings)
+    commit, dirty = git_revision()
+
+    cases = []
+    with StubServer(latency=args.latency) as stub:
+        for scenario in args.scenario or SCENARIOS:
+            for orientation in args.orientation or list(ORIENTATIONS):
+                print(f"=== {scenario}/{orientation} ===")
+                cases.append(run_case(scenario, orientation, args, stub.address))
+
+    result = {"commit": commit, "dirty": dirty, "date": time.strftime('%Y-%m-%dT%H:%M:%S'), "python": platform.python_version(),
+              "platform": platform.platform(), "cpu_count": os.cpu_count(), "settings": settings, "cases": cases}
+    print_results(cases)
+    if baseline_file is not None and baseline_file.exists():
+        with baseline_file.open('r', encoding='utf-8') as f:
+            print_comparison(cases, json.load(f), baseline_file)
+    if not args.no_save:
+        print(f"\n結果を保存しました: {save_results(result)}")
+
+if __name__ == "__main__":
+    main()
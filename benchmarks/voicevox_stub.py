@@ -0,0 +1,156 @@
+import argparse
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+SAMPLE_RATE = 24000
+CONSONANT_LENGTH = 0.04
+VOWEL_LENGTH = 0.08
+PAUSE_LENGTH = 0.3
+PHONEME_LENGTH = 0.1
+PAUSE_CHARACTERS = "、。！？!?,."
+STUB_VERSION = "0.0.0-stub"
+REQUEST_QUEUE_SIZE = 128
+
+def build_accent_phrases(text: str) -> List[Dict[str, Any]]:
+    phrases = []
+    for match in re.finditer(f"([^{PAUSE_CHARACTERS}]+)([{PAUSE_CHARACTERS}]?)", text):
+        moras = [{"text": char, "consonant": "k", "consonant_length": CONSONANT_LENGTH, "vowel": "a",
+                  "vowel_length": VOWEL_LENGTH, "pitch": 5.5} for char in match.group(1) if not char.isspace()]
+        if not moras:
+            continue
+        pause_mora = {"text": "、", "consonant": None, "consonant_length": None, "vowel": "pau",
+                      "vowel_length": PAUSE_LENGTH, "pitch": 0.0} if match.group(2) else None
+        phrases.append({"moras": moras, "accent": 1, "pause_mora": pause_mora, "is_interrogative": False})
+    return phrases
+
+def build_audio_query(text: str) -> Dict[str, Any]:
+    return {
+        "accent_phrases": build_accent_phrases(text),
+        "speedScale": 1.0,
+        "pitchScale": 0.0,
+        "intonationScale": 1.0,
+        "volumeScale": 1.0,
+        "prePhonemeLength": PHONEME_LENGTH,
+        "postPhonemeLength": PHONEME_LENGTH,
+        "outputSamplingRate": SAMPLE_RATE,
+        "outputStereo": False,
+        "kana": text,
+    }
+
+def query_duration(query: Dict[str, Any]) -> float:
+    duration = query.get("prePhonemeLength", 0.0) + query.get("postPhonemeLength", 0.0)
+    for phrase in query.get("accent_phrases", []):
+        for mora in phrase.get("moras", []):
+            duration += (mora.get("consonant_length") or 0.0) + mora["vowel_length"]
+        if phrase.get("pause_mora"):
+            duration += phrase["pause_mora"]["vowel_length"]
+    return duration / max(query.get("speedScale", 1.0), 0.1)
+
+def synthesize_wav(query: Dict[str, Any], speaker: int) -> bytes:
+    seed = int.from_bytes(hashlib.sha256(json.dumps(query, sort_keys=True).encode('utf-8')).digest()[:8], 'little')
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(query_duration(query) * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 150 + 10 * (speaker % 20)
+    voice = sum(np.sin(2 * np.pi * pitch * (i + 1) * t) / (i + 1) for i in range(4))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+    audio = (voice * envelope + 0.01 * rng.standard_normal(len(t))) / 3
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+    return buffer.getvalue()
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    def send_body(self, body: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, data: Any) -> None:
+        self.send_body(json.dumps(data, ensure_ascii=False).encode('utf-8'), "application/json")
+
+    def do_GET(self) -> None:
+        path = urlparse(self.path).path
+        if path == "/version":
+            self.send_json(STUB_VERSION)
+        elif path == "/user_dict":
+            self.send_json({})
+        else:
+            self.send_error(404)
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.received.append((url.path, params))
+        time.sleep(self.server.latency)
+        if url.path == "/audio_query":
+            self.send_json(build_audio_query(params.get("text", "")))
+        elif url.path == "/synthesis":
+            self.send_body(synthesize_wav(json.loads(body), int(params.get("speaker", 0))), "audio/wav")
+        else:
+            self.send_error(404)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+class StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = REQUEST_QUEUE_SIZE
+
+class StubServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.server = StubHTTPServer((host, port), StubRequestHandler)
+        self.server.latency = latency
+        self.server.received = []
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def received(self) -> List[Tuple[str, Dict[str, str]]]:
+        return self.server.received
+
+    @property
+    def address(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    def __enter__(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="決定的なWAVを返すVOICEVOXエンジンのスタブ")
+    parser.add_argument("--host", default="127.0.0.1", help="待ち受けるアドレス (デフォルト: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=50021, help="待ち受けるポート (デフォルト: 50021)")
+    parser.add_argument("--latency", type=float, default=0.0, help="リクエストごとに加える遅延 (秒)")
+    args = parser.parse_args()
+
+    with StubServer(args.host, args.port, args.latency) as stub:
+        print(f"VOICEVOXスタブを起動しました: {stub.address}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import base64
 import os
+import sys
 import argparse
 
 def encode_bgm(input_file, output_file):
@@ -9,9 +10,17 @@ def encode_bgm(input_file, output_file):
     with open(output_file, "wb") as f:
         f.write(encoded)
 
+def add_to_store(bgm_file):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from bgm_store import get_bgm_store
+
+    track = get_bgm_store().add(bgm_file)
+    print(f"BGM added to store: {track.name} ({track.digest[:12]}, {track.duration:.1f}s)")
+
 def main():
     parser = argparse.ArgumentParser(description="Encode BGM file to base64")
     parser.add_argument("input_file", help="Path to the input BGM file")
+    parser.add_argument("-s", "--store", action="store_true", help="Decode the encoded BGM into the BGM store and update the keyword index")
     args = parser.parse_args()
 
     input_file = args.input_file
@@ -20,5 +29,8 @@ def main():
     encode_bgm(input_file, output_file)
     print(f"BGM encoded and saved to {output_file}")
 
+    if args.store:
+        add_to_store(output_file)
+
 if __name__ == "__main__":
     main()
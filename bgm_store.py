@@ -0,0 +1,152 @@
+import os
+import json
+import base64
+import hashlib
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from ffmpeg_utils import run_ffmpeg
+from synthesis_cache import CACHE_DIR
+
+BGM_DIR = Path('bgm')
+STORE_DIR = CACHE_DIR / 'bgm'
+INDEX_FILE = 'index.json'
+DEFAULT_TRACK = 'default'
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+class BGMTrack(NamedTuple):
+    digest: str
+    name: str
+    path: Path
+    frames: int
+
+    @property
+    def duration(self) -> float:
+        return self.frames / SAMPLE_RATE
+
+    def load(self) -> np.ndarray:
+        return np.memmap(self.path, dtype=np.int16, mode='r', shape=(self.frames, CHANNELS))
+
+def track_keywords(name: str) -> List[str]:
+    return [keyword for keyword in name.lower().split('_') if keyword]
+
+class BGMStore:
+    def __init__(self, store_dir: Path = STORE_DIR, source_dir: Path = BGM_DIR):
+        self.store_dir = Path(store_dir)
+        self.source_dir = Path(source_dir)
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+    def _load_index(self) -> Dict:
+        index_path = self.store_dir / INDEX_FILE
+        if index_path.exists():
+            with index_path.open('r', encoding='utf-8') as f:
+                return json.load(f)
+        return {"tracks": {}, "sources": {}, "keywords": {}}
+
+    def _save_index(self) -> None:
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        index_path = self.store_dir / INDEX_FILE
+        temp_path = index_path.with_suffix(f".{os.getpid()}.tmp")
+        with temp_path.open('w', encoding='utf-8') as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, index_path)
+
+    def _rebuild_keywords(self) -> None:
+        self._index["sources"] = {path: source for path, source in self._index["sources"].items() if Path(path).exists()}
+        source_dir = self.source_dir.resolve()
+        selectable = {source["digest"] for path, source in self._index["sources"].items() if Path(path).parent == source_dir}
+
+        keywords: Dict[str, List[str]] = {}
+        for digest, track in sorted(self._index["tracks"].items(), key=lambda item: item[1]["name"]):
+            if digest not in selectable:
+                continue
+            for keyword in track["keywords"]:
+                keywords.setdefault(keyword, []).append(digest)
+        self._index["keywords"] = keywords
+
+    def _track(self, digest: str) -> BGMTrack:
+        track = self._index["tracks"][digest]
+        return BGMTrack(digest, track["name"], self.store_dir / f"{digest}.pcm", track["frames"])
+
+    def add(self, source: Path, name: Optional[str] = None) -> BGMTrack:
+        source = Path(source)
+        with self._lock:
+            track = self._add(source, name or source.stem)
+            self._rebuild_keywords()
+            self._save_index()
+        return track
+
+    def _add(self, source: Path, name: str) -> BGMTrack:
+        stat = source.stat()
+        source_key = str(source.resolve())
+        known = self._index["sources"].get(source_key)
+        if known and known["size"] == stat.st_size and known["mtime"] == stat.st_mtime and known["digest"] in self._index["tracks"]:
+            track = self._track(known["digest"])
+            if track.path.exists():
+                return track
+
+        data = source.read_bytes()
+        if source.suffix == '.bin':
+            data = base64.b64decode(data)
+        digest = hashlib.sha256(data).hexdigest()
+
+        pcm_path = self.store_dir / f"{digest}.pcm"
+        if digest not in self._index["tracks"] or not pcm_path.exists():
+            print(f"BGMをデコードしています: {source}")
+            pcm = run_ffmpeg(["-i", "pipe:0", "-f", "s16le", "-acodec", "pcm_s16le",
+                              "-ac", str(CHANNELS), "-ar", str(SAMPLE_RATE), "pipe:1"], input_data=data)
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            temp_path = pcm_path.with_suffix(f".{os.getpid()}.tmp")
+            temp_path.write_bytes(pcm)
+            os.replace(temp_path, pcm_path)
+            frames = len(pcm) // (2 * CHANNELS)
+        else:
+            frames = self._index["tracks"][digest]["frames"]
+
+        self._index["tracks"][digest] = {"name": name, "keywords": track_keywords(name), "frames": frames}
+        self._index["sources"][source_key] = {"size": stat.st_size, "mtime": stat.st_mtime, "digest": digest}
+        return self._track(digest)
+
+    def sync(self) -> None:
+        with self._lock:
+            sources = [f for f in self.source_dir.iterdir() if f.suffix in ('.bin', '.mp3')] if self.source_dir.exists() else []
+            before = json.dumps(self._index, sort_keys=True)
+            for source in sources:
+                self._add(source, source.stem)
+            self._rebuild_keywords()
+            if json.dumps(self._index, sort_keys=True) != before:
+                self._save_index()
+
+    def select(self, atmosphere: str) -> BGMTrack:
+        atmosphere_keywords = set(keyword.strip().lower() for keyword in atmosphere.split('、'))
+        default_source = str((self.source_dir / f"{DEFAULT_TRACK}.bin").resolve())
+        matches: Counter = Counter()
+        with self._lock:
+            for keyword in atmosphere_keywords:
+                for digest in self._index["keywords"].get(keyword, []):
+                    matches[digest] += 1
+
+            if matches:
+                best_digest, _ = max(matches.items(), key=lambda item: (item[1], -len(self._index["tracks"][item[0]]["keywords"])))
+                return self._track(best_digest)
+
+            if default_source in self._index["sources"]:
+                return self._track(self._index["sources"][default_source]["digest"])
+        raise FileNotFoundError("デフォルトのBGMが見つかりません。")
+
+_store: Optional[BGMStore] = None
+_store_lock = threading.Lock()
+
+def get_bgm_store() -> BGMStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = BGMStore()
+            _store.sync()
+        return _store
@@ -1,10 +1,23 @@
+import os
 import re
 import requests
 import sys
 import time
+from pathlib import Path
 from atproto import Client, models
+from atproto_client.client.session import Session
 from atproto_client.exceptions import UnauthorizedError
 
+from ffmpeg_utils import probe_duration, run_ffmpeg
+
+MAX_VIDEO_BYTES = int(float(os.getenv('BLUESKY_MAX_VIDEO_MB', '100')) * 1024 * 1024)
+MAX_VIDEO_SECONDS = float(os.getenv('BLUESKY_MAX_VIDEO_SECONDS', '180'))
+SIZE_TARGET_MARGIN = 0.95
+UPLOAD_AUDIO_BITRATE = 128000
+MIN_VIDEO_BITRATE = 200000
+UPLOAD_RETRIES = 3
+DEFAULT_PDS = 'https://bsky.social'
+
 def extract_uri_cid(url):
     match = re.search(r'profile/([^/]+)/post/([^/]+)', url)
     if not match:
@@ -46,31 +59,92 @@ def authenticate(bs_client, username, password, retries=3, wait_time=5):
                 print("All retry attempts failed. Please check your credentials.")
                 raise e
 
-def post(username, password, text, url=None):
-    uri, cid = extract_uri_cid(url)
+def transcode_to_size(video_file, output_file, duration, max_bytes=MAX_VIDEO_BYTES):
+    from generate_movie import X264_PARAMS
+    video_bitrate = int(max_bytes * 8 * SIZE_TARGET_MARGIN / duration) - UPLOAD_AUDIO_BITRATE
+    if video_bitrate < MIN_VIDEO_BITRATE:
+        raise ValueError(f"目標サイズに収めるにはビットレートが低すぎます: {video_bitrate // 1000}kbps")
+
+    passlog = output_file.with_name(f"{output_file.stem}_2pass")
+    encode = ["-i", str(video_file), "-c:v", "libx264", "-preset", "medium", "-b:v", str(video_bitrate), *X264_PARAMS,
+              "-passlogfile", str(passlog)]
+    try:
+        run_ffmpeg(encode + ["-pass", "1", "-an", "-f", "null", "-"])
+        run_ffmpeg(encode + ["-pass", "2", "-c:a", "aac", "-b:a", str(UPLOAD_AUDIO_BITRATE), "-movflags", "+faststart",
+                             str(output_file)])
+    finally:
+        for log_file in passlog.parent.glob(f"{passlog.name}*"):
+            log_file.unlink()
+
+def prepare_video(video_file):
+    video_file = Path(video_file)
+    size = video_file.stat().st_size
+    duration = probe_duration(video_file)
+    print(f"動画: {size / 2**20:.1f}MB, {duration:.1f}秒")
+    if duration > MAX_VIDEO_SECONDS:
+        print(f"動画が長すぎるため投稿できません (上限: {MAX_VIDEO_SECONDS:.0f}秒)")
+        return None
+    if size <= MAX_VIDEO_BYTES:
+        return video_file
+
+    output_file = video_file.with_name(f"{video_file.stem}_bluesky{video_file.suffix}")
+    print(f"ファイルサイズが上限 ({MAX_VIDEO_BYTES / 2**20:.0f}MB) を超えているため、2パスで再エンコードします...")
+    try:
+        transcode_to_size(video_file, output_file, duration)
+    except (ValueError, RuntimeError) as e:
+        print(f"再エンコードに失敗しました: {e}")
+        return None
+    if output_file.stat().st_size > MAX_VIDEO_BYTES:
+        print(f"再エンコード後もファイルサイズが上限を超えています: {output_file.stat().st_size / 2**20:.1f}MB")
+        return None
+    print(f"再エンコードしました: {output_file} ({output_file.stat().st_size / 2**20:.1f}MB)")
+    return output_file
+
+def request_upload(client, video):
+    client.com.atproto.server.get_session()
+    session = Session.decode(client.export_session_string())
+    pds = (session.pds_endpoint or DEFAULT_PDS).rstrip('/')
+    video.seek(0)
+    return requests.post(f"{pds}/xrpc/com.atproto.repo.uploadBlob", data=video,
+                         headers={"Authorization": f"Bearer {session.access_jwt}", "Content-Type": "video/mp4"})
+
+def upload_video(client, video, username, password):
+    response = request_upload(client, video)
+    if response.status_code == 401:
+        print("セッションの有効期限が切れているため、再度ログインしてアップロードします。")
+        authenticate(client, username, password)
+        response = request_upload(client, video)
+    response.raise_for_status()
+    return models.ComAtprotoRepoUploadBlob.Response.model_validate(response.json()).blob
+
+def post(username, password, text, url=None, video_file='output/final_dialogue_output.mp4'):
+    upload_file = prepare_video(video_file)
+    if upload_file is None:
+        print("Blueskyへの投稿を中止しました。")
+        return
+
+    uri, cid = extract_uri_cid(url) if url else (None, None)
     print(f"URI: {uri}, CID: {cid}")
 
     client = Client()
     authenticate(client, username, password)
 
-    with open('output/final_dialogue_output.mp4', 'rb') as f:
-        vid_data = f.read()
+    reply_to = None
+    if cid and uri:
+        parent_ref = models.ComAtprotoRepoStrongRef.Main(cid=cid, uri=uri)
+        reply_to = models.AppBskyFeedPost.ReplyRef(parent=parent_ref, root=parent_ref)
 
-    retries = 3
-    for attempt in range(1, retries + 1):
-        try:
-            if cid and uri:
-                parent_ref = models.ComAtprotoRepoStrongRef.Main(cid=cid, uri=uri)
-                reply_to = models.AppBskyFeedPost.ReplyRef(parent=parent_ref, root=parent_ref)
-                client.send_video(text=text, video=vid_data, video_alt=text, reply_to=reply_to)
-            else:
-                client.send_video(text=text, video=vid_data, video_alt=text)
-            break
-        except Exception as e:
-            print(f"送信に失敗しました。リトライします... リトライ回数: {attempt}, エラー: {e}")
-            time.sleep(3)
-    else:
-        print("リトライ上限に達しました。送信に失敗しました。")
+    with open(upload_file, 'rb') as video:
+        for attempt in range(1, UPLOAD_RETRIES + 1):
+            try:
+                embed = models.AppBskyEmbedVideo.Main(video=upload_video(client, video, username, password), alt=text)
+                client.send_post(text=text, embed=embed, reply_to=reply_to)
+                break
+            except Exception as e:
+                print(f"送信に失敗しました。リトライします... リトライ回数: {attempt}, エラー: {e}")
+                time.sleep(3)
+        else:
+            print("リトライ上限に達しました。送信に失敗しました。")
 
 def main():
     if len(sys.argv) > 1:
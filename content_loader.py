@@ -1,12 +1,8 @@
-import chardet
 import os
 import re
 import requests
 import sys
-from bs4 import BeautifulSoup
-from langchain_community.document_loaders import YoutubeLoader
 from urllib.parse import urlparse
-from PyPDF2 import PdfReader
 from utils import APIKeyManager, GeminiHandler
 
 OUTPUT_DIR = 'output'
@@ -15,6 +11,7 @@ CONTENT_OUTPUT_FILE = 'retrieved_content.txt'
 class WebScraper:
     @classmethod
     def scrape_website(cls, url: str) -> str:
+        from bs4 import BeautifulSoup
         response = requests.get(url)
         soup = BeautifulSoup(response.content, 'html.parser')
         text_content = soup.get_text(separator=' ', strip=True)
@@ -39,6 +36,7 @@ Webページのコンテンツ:
         if not re.match(github_pattern, url):
             return ""
 
+        from bs4 import BeautifulSoup
         for branch in ['main', 'master']:
             for filename in ['README.md', 'README.rst']:
                 readme_url = f"{url.rstrip('/')}/raw/{branch}/{filename}"
@@ -56,6 +54,7 @@ Webページのコンテンツ:
 
     @staticmethod
     def scrape_amazon_product(url: str) -> str:
+        from bs4 import BeautifulSoup
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
@@ -94,6 +93,7 @@ class YouTubeHandler:
 
     @staticmethod
     def get_youtube_content(url: str) -> str:
+        from langchain_community.document_loaders import YoutubeLoader
         try:
             loader = YoutubeLoader.from_youtube_url(url, language=["en", "ja"])
             docs = loader.load()
@@ -124,6 +124,7 @@ class YouTubeHandler:
 class PDFHandler:
     @staticmethod
     def extract_text_from_pdf(file_path: str) -> str:
+        from PyPDF2 import PdfReader
         with open(file_path, 'rb') as file:
             pdf_reader = PdfReader(file)
             text = ""
@@ -178,6 +179,7 @@ class ContentLoader:
         if file_path.lower().endswith('.pdf'):
             return PDFHandler.extract_text_from_pdf(file_path)
 
+        import chardet
         with open(file_path, 'rb') as f:
             raw_data = f.read()
         encoding = chardet.detect(raw_data)['encoding']
@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from batch import job_arguments
+from main import OUTPUT_DIR, JobCancelled, build_parser, check_cancelled, create_render_pool, create_video
+from synthesis_cache import set_cache_enabled
+
+DAEMON_HOST = os.getenv('RENDER_DAEMON_HOST', '127.0.0.1')
+DAEMON_PORT = int(os.getenv('RENDER_DAEMON_PORT', '8765'))
+JOBS_DIR = OUTPUT_DIR / 'jobs'
+DEFAULT_MAX_JOBS = 2
+MAX_FINISHED_JOBS = 100
+MAX_REQUEST_BYTES = 1 << 20
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+class RenderJob:
+    def __init__(self, job_id: str, spec: Dict[str, Any], argv: List[str], name: str):
+        self.id = job_id
+        self.spec = spec
+        self.argv = argv
+        self.name = name
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.outputs: List[str] = []
+        self.error = ""
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed": end - self.started_at if self.started_at else 0.0,
+            "outputs": self.outputs,
+            "error": self.error,
+        }
+
+class RenderDaemon:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self._jobs: Dict[str, RenderJob] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=args.max_jobs, thread_name_prefix="render-job")
+        self._render_pool = create_render_pool(args.render_workers)
+
+    def warm_up(self) -> None:
+        from bgm_store import get_bgm_store
+        from generate_movie import find_font
+        from utils import load_characters
+        from voicevox_client import get_client
+
+        print("キャラクター設定、フォント、BGMを読み込んでいます...")
+        load_characters()
+        find_font()
+        get_bgm_store()
+        try:
+            get_client()
+        except Exception as e:
+            print(f"警告: VOICEVOXクライアントを初期化できませんでした: {e}")
+
+    def submit(self, spec: Dict[str, Any]) -> RenderJob:
+        job_id = uuid.uuid4().hex[:12]
+        name = f"{spec.get('name') or 'job'}_{job_id}"
+        argv = job_arguments(spec, name, self.args)
+        try:
+            build_parser().parse_args(argv)
+        except SystemExit:
+            raise ValueError("ジョブのオプションが不正です。")
+
+        job = RenderJob(job_id, spec, argv, name)
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = job
+            job.future = self._executor.submit(self._run, job)
+        print(f"ジョブを受け付けました: {name}")
+        return job
+
+    def get(self, job_id: str) -> Optional[RenderJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[RenderJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[RenderJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.cancel_event.set()
+            if job.future is not None and job.future.cancel():
+                job.status = "cancelled"
+                job.finished_at = time.time()
+            else:
+                job.status = "cancelling"
+        print(f"ジョブのキャンセルを要求しました: {job.name}")
+        return job
+
+    def shutdown(self) -> None:
+        for job in self.list():
+            job.cancel_event.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._render_pool.shutdown()
+
+    def _prune(self) -> None:
+        finished = sorted((job for job in self._jobs.values() if job.finished), key=lambda job: job.finished_at or 0.0)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+
+    def _finish(self, job: RenderJob, status: str, outputs: Optional[List[str]] = None, error: str = "") -> None:
+        with self._lock:
+            job.status = status
+            job.outputs = outputs or []
+            job.error = error
+            job.finished_at = time.time()
+
+    def _run(self, job: RenderJob) -> None:
+        with self._lock:
+            if job.cancel_event.is_set():
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                return
+            job.status = "running"
+            job.started_at = time.time()
+
+        work_dir = JOBS_DIR / job.id
+        try:
+            job_args = build_parser().parse_args(job.argv)
+            _, output_files = create_video(job_args, render_pool=self._render_pool, work_dir=work_dir,
+                                           cancel_event=job.cancel_event)
+            check_cancelled(job.cancel_event)
+        except JobCancelled:
+            self._finish(job, "cancelled")
+            print(f"ジョブをキャンセルしました: {job.name}")
+        except (Exception, SystemExit) as e:
+            self._finish(job, "failed", error=str(e))
+            print(f"ジョブ {job.name} が失敗しました: {e}")
+        else:
+            self._finish(job, "succeeded", outputs=[str(path) for path in output_files.values()])
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    @property
+    def render_daemon(self) -> RenderDaemon:
+        return self.server.render_daemon
+
+    def path_parts(self) -> List[str]:
+        return [part for part in self.path.split('?', 1)[0].split('/') if part]
+
+    def send_json(self, status: HTTPStatus, body: Any) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status: HTTPStatus, message: str) -> None:
+        self.send_json(status, {"error": message})
+
+    def read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            raise ValueError("リクエストが大きすぎます。")
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self) -> None:
+        parts = self.path_parts()
+        if parts == ["health"]:
+            jobs = self.render_daemon.list()
+            self.send_json(HTTPStatus.OK, {"status": "ok", "active_jobs": sum(not job.finished for job in jobs)})
+        elif parts == ["jobs"]:
+            self.send_json(HTTPStatus.OK, {"jobs": [job.to_dict() for job in self.render_daemon.list()]})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.render_daemon.get(parts[1])
+            if job is None:
+                self.send_error_json(HTTPStatus.NOT_FOUND, f"ジョブが見つかりません: {parts[1]}")
+            else:
+                self.send_json(HTTPStatus.OK, job.to_dict())
+        else:
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"不明なパスです: {self.path}")
+
+    def do_POST(self) -> None:
+        if self.path_parts() != ["jobs"]:
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"不明なパスです: {self.path}")
+            return
+        try:
+            spec = self.read_json()
+            if not isinstance(spec, dict):
+                raise ValueError("ジョブ定義はオブジェクトで記述してください。")
+            job = self.render_daemon.submit(spec)
+        except ValueError as e:
+            self.send_error_json(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        self.send_json(HTTPStatus.CREATED, job.to_dict())
+
+    def do_DELETE(self) -> None:
+        parts = self.path_parts()
+        if len(parts) != 2 or parts[0] != "jobs":
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"不明なパスです: {self.path}")
+            return
+        job = self.render_daemon.cancel(parts[1])
+        if job is None:
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"ジョブが見つかりません: {parts[1]}")
+        elif job.status in ("succeeded", "failed"):
+            self.send_error_json(HTTPStatus.CONFLICT, f"ジョブは既に終了しています: {job.status}")
+        else:
+            self.send_json(HTTPStatus.ACCEPTED, job.to_dict())
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="対話動画の生成ジョブを受け付けるローカルHTTPデーモン")
+    parser.add_argument("--host", default=DAEMON_HOST, help=f"待ち受けるアドレス (デフォルト: 環境変数RENDER_DAEMON_HOSTまたは{DAEMON_HOST})")
+    parser.add_argument("--port", type=int, default=DAEMON_PORT, help=f"待ち受けるポート (デフォルト: 環境変数RENDER_DAEMON_PORTまたは{DAEMON_PORT})")
+    parser.add_argument("--max-jobs", type=int, default=DEFAULT_MAX_JOBS, help=f"同時に実行するジョブ数 (デフォルト: {DEFAULT_MAX_JOBS})")
+    parser.add_argument("-j", "--jobs", type=int, help="VOICEVOXの同時合成数 (デフォルト: 環境変数VOICEVOX_CONCURRENCYまたは4)")
+    parser.add_argument("-w", "--render-workers", type=int, help="テロップ動画を並列に生成するプロセス数 (デフォルト: CPUコア数)")
+    parser.add_argument("--no-cache", action="store_true", help="合成音声キャッシュを使用しない")
+    return parser.parse_args()
+
+def main() -> None:
+    args = parse_arguments()
+    if args.max_jobs < 1:
+        raise SystemExit("エラー: --max-jobs には1以上を指定してください。")
+    set_cache_enabled(not args.no_cache)
+
+    render_daemon = RenderDaemon(args)
+    render_daemon.warm_up()
+    server = ThreadingHTTPServer((args.host, args.port), DaemonRequestHandler)
+    server.render_daemon = render_daemon
+    print(f"レンダリングデーモンを起動しました: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nデーモンを停止しています...")
+    finally:
+        server.server_close()
+        render_daemon.shutdown()
+
+if __name__ == "__main__":
+    main()
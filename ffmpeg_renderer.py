@@ -0,0 +1,159 @@
+import math
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+from PIL import Image
+
+from audio_mixer import LEAD_SILENCE, TAIL_SILENCE
+from ffmpeg_utils import probe_duration, run_ffmpeg
+from generate_movie import (ANIMATION_DURATION, EMOTION_ROTATIONS, FPS, SEGMENT_PARAMS, X264_PARAMS, RenderProfile,
+                            create_subtitle_image, create_title_overlay, get_frame_size, get_render_profile, pad_for_rotation)
+
+AUDIO_BITRATE = "192k"
+EDGE_FADE_DURATION = 0.5
+
+SLIDE_EXPRESSIONS = {
+    "slide_right": ("0", "min(0,{size}*(t/{duration}-1))"),
+    "slide_left": ("0", "max(0,{size}*(1-t/{duration}))"),
+    "slide_top": ("max(0,{size}*(1-t/{duration}))", "0"),
+    "slide_bottom": ("min(0,{size}*(t/{duration}-1))", "0"),
+}
+
+def frame_durations(durations: Sequence[float], fps: int = FPS) -> List[float]:
+    return [math.ceil(duration * fps) / fps for duration in durations]
+
+def line_frame_counts(durations: Sequence[float], fps: int) -> List[int]:
+    boundaries = [int(round(sum(durations[:i]) * fps)) for i in range(len(durations) + 1)]
+    return [end - start for start, end in zip(boundaries, boundaries[1:])]
+
+def overlay_position(animation_type: str, is_vertical: bool, position: Tuple[int, int] = (0, 0), scale: float = 1.0) -> Tuple[str, str]:
+    size = get_frame_size(is_vertical, scale)[0]
+    x, y = SLIDE_EXPRESSIONS.get(animation_type, ("0", "0"))
+    return (f"{position[0]}+{x.format(size=size, duration=ANIMATION_DURATION)}",
+            f"{position[1]}+{y.format(size=size, duration=ANIMATION_DURATION)}")
+
+def rotation_expression(emotions) -> str:
+    terms = [f"{amplitude}*sin(t*{speed})" for amplitude, speed in (EMOTION_ROTATIONS[e] for e in emotions if e in EMOTION_ROTATIONS)]
+    return f"({'+'.join(terms)})*PI/180" if terms else ""
+
+def image_input(image_file: Path, duration: float, fps: int = FPS) -> List[str]:
+    return ["-loop", "1", "-framerate", str(fps), "-t", f"{duration:.6f}", "-i", str(image_file)]
+
+def repeat_frame(frames: int, fps: int) -> str:
+    return f"loop=loop={frames - 1}:size=1,setpts=N/{fps}/TB"
+
+def black_frames(width: int, height: int, frames: int, fps: int, label: str) -> str:
+    return f"color=c=black:s={width}x{height}:r={fps}:d={frames / fps:.6f}[{label}]"
+
+def animated_line(i: int, frames: int, angle: str, position: Tuple[int, int], animation_type: str, is_vertical: bool,
+                  profile: RenderProfile) -> List[str]:
+    width, height = get_frame_size(is_vertical, profile.scale)
+    duration = frames / profile.fps
+    fade_out_start = max(0.0, duration - ANIMATION_DURATION)
+    layer = (f"[{i}:v]format=rgba,{repeat_frame(frames, profile.fps)},fade=t=in:st=0:d={ANIMATION_DURATION}:alpha=1,"
+             f"fade=t=out:st={fade_out_start:.6f}:d={ANIMATION_DURATION}:alpha=1")
+    if angle:
+        layer += f",rotate=a='{angle}':c=none"
+    x, y = overlay_position(animation_type, is_vertical, position, profile.scale)
+    return [f"{layer}[fg{i}]", black_frames(width, height, frames, profile.fps, f"bg{i}"),
+            f"[bg{i}][fg{i}]overlay=x='{x}':y='{y}':eof_action=pass[line{i}]"]
+
+def memoized_line(i: int, frames: int, edge_frames: int, position: Tuple[int, int], animation_type: str, is_vertical: bool,
+                  profile: RenderProfile) -> List[str]:
+    width, height = get_frame_size(is_vertical, profile.scale)
+    fps = profile.fps
+    x, y = overlay_position(animation_type, is_vertical, position, profile.scale)
+    still_frames = frames - 2 * edge_frames
+    return [
+        f"[{i}:v]format=rgba,split=3[head{i}][still{i}][tail{i}]",
+        f"[head{i}]{repeat_frame(edge_frames, fps)},fade=t=in:st=0:d={ANIMATION_DURATION}:alpha=1[fgh{i}]",
+        black_frames(width, height, edge_frames, fps, f"bgh{i}"),
+        f"[bgh{i}][fgh{i}]overlay=x='{x}':y='{y}':eof_action=pass[lh{i}]",
+        black_frames(width, height, 1, fps, f"bgs{i}"),
+        f"[bgs{i}][still{i}]overlay=x={position[0]}:y={position[1]},{repeat_frame(still_frames, fps)},fps={fps}[ls{i}]",
+        f"[tail{i}]{repeat_frame(edge_frames, fps)},fade=t=out:st=0:d={ANIMATION_DURATION}:alpha=1[fgt{i}]",
+        black_frames(width, height, edge_frames, fps, f"bgt{i}"),
+        f"[bgt{i}][fgt{i}]overlay=x={position[0]}:y={position[1]}:eof_action=pass[lt{i}]",
+        f"[lh{i}][ls{i}][lt{i}]concat=n=3:v=1:a=0[line{i}]",
+    ]
+
+def segment_codec_args(profile: RenderProfile) -> List[str]:
+    return ["-c:v", "libx264", "-preset", profile.preset, "-b:v", profile.bitrate, "-r", str(profile.fps), *SEGMENT_PARAMS]
+
+def encode_edge_segment(video_file: Path, output_file: Path, fade_in: bool, fade_out: bool, profile: RenderProfile) -> None:
+    filters = []
+    if fade_in:
+        filters.append(f"fade=t=in:st=0:d={EDGE_FADE_DURATION}")
+    if fade_out:
+        fade_out_start = max(0.0, probe_duration(video_file) - EDGE_FADE_DURATION)
+        filters.append(f"fade=t=out:st={fade_out_start:.6f}:d={EDGE_FADE_DURATION}")
+    filters.append(f"tpad=start_duration={LEAD_SILENCE if fade_in else 0}:stop_duration={TAIL_SILENCE if fade_out else 0}:color=black")
+    filters.append("format=yuv420p")
+    run_ffmpeg(["-i", str(video_file), "-vf", ",".join(filters), "-an", *segment_codec_args(profile), str(output_file)])
+
+def concat_entry(segment: Path) -> str:
+    escaped = Path(segment).resolve().as_posix().replace("'", "'\\''")
+    return f"file '{escaped}'\n"
+
+def concat_segments(segments: Sequence[Path], audio_file: Path, output_file: Path, list_file: Path) -> None:
+    list_file.write_text("".join(concat_entry(segment) for segment in segments), encoding="utf-8")
+    run_ffmpeg(["-f", "concat", "-safe", "0", "-i", str(list_file), "-i", str(audio_file),
+                "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac", "-b:a", AUDIO_BITRATE,
+                "-movflags", "+faststart", str(output_file)])
+
+def render_dialogue_video(dialogue: Sequence[Tuple[str, str]], durations: Sequence[float], animation_types: Sequence[str],
+                          title: str, is_vertical: bool, audio_file: Path, output_file: Path, work_dir: Path,
+                          draft: bool = False) -> None:
+    profile = get_render_profile(draft)
+    inputs: List[str] = []
+    filters: List[str] = []
+    line_labels = []
+    edge_frames = int(round(ANIMATION_DURATION * profile.fps))
+
+    for i, ((character, text), frames, animation_type) in enumerate(zip(dialogue, line_frame_counts(durations, profile.fps), animation_types)):
+        sprite, position, emotions = create_subtitle_image(text, character, is_vertical, draft)
+        angle = rotation_expression(emotions)
+        if angle:
+            sprite, position = pad_for_rotation(sprite, position, emotions)
+        image_file = work_dir / f"bubble_{i + 1}.png"
+        Image.fromarray(sprite).save(image_file)
+        inputs += ["-i", str(image_file)]
+
+        if angle or frames <= 2 * edge_frames:
+            filters += animated_line(i, frames, angle, position, animation_type, is_vertical, profile)
+        else:
+            filters += memoized_line(i, frames, edge_frames, position, animation_type, is_vertical, profile)
+        line_labels.append(f"[line{i}]")
+
+    body_duration = sum(durations)
+    filters.append(f"{''.join(line_labels)}concat=n={len(line_labels)}:v=1:a=0[body]")
+    current = "[body]"
+
+    title_overlay = create_title_overlay(title, is_vertical, draft)
+    if title_overlay is not None:
+        title_img, (title_x, title_y) = title_overlay
+        title_file = work_dir / "title.png"
+        Image.fromarray(title_img).save(title_file)
+        title_index = len(dialogue)
+        inputs += image_input(title_file, body_duration, profile.fps)
+        filters.append(f"{current}[{title_index}:v]overlay={title_x}:{title_y}:eof_action=pass[titled]")
+        current = "[titled]"
+
+    fade_out_start = max(0.0, body_duration - EDGE_FADE_DURATION)
+    filters.append(f"{current}fade=t=in:st=0:d={EDGE_FADE_DURATION},fade=t=out:st={fade_out_start:.6f}:d={EDGE_FADE_DURATION},"
+                   f"tpad=start={round(LEAD_SILENCE * profile.fps)}:stop={round(TAIL_SILENCE * profile.fps)}:color=black,format=yuv420p[video]")
+
+    audio_index = len(dialogue) + (1 if title_overlay is not None else 0)
+    inputs += ["-i", str(audio_file)]
+
+    filter_script = work_dir / "filtergraph.txt"
+    filter_script.write_text(";\n".join(filters), encoding="utf-8")
+
+    print("ffmpegで動画を合成しています...")
+    run_ffmpeg(inputs + [
+        "-filter_complex_script", str(filter_script),
+        "-map", "[video]", "-map", f"{audio_index}:a",
+        "-c:v", "libx264", "-preset", profile.preset, "-b:v", profile.bitrate, "-r", str(profile.fps), *X264_PARAMS,
+        "-c:a", "aac", "-b:a", AUDIO_BITRATE,
+        str(output_file)
+    ])
@@ -0,0 +1,29 @@
+import re
+import shutil
+import subprocess
+from typing import List, Optional
+
+def get_ffmpeg_exe() -> str:
+    try:
+        from imageio_ffmpeg import get_ffmpeg_exe as get_imageio_ffmpeg_exe
+        return get_imageio_ffmpeg_exe()
+    except ImportError:
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise FileNotFoundError("ffmpegが見つかりません。")
+        return ffmpeg
+
+def run_ffmpeg(args: List[str], input_data: Optional[bytes] = None) -> bytes:
+    command = [get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y"] + args
+    result = subprocess.run(command, input=input_data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpegの実行に失敗しました: {result.stderr.decode('utf-8', errors='replace').strip()}")
+    return result.stdout
+
+def probe_duration(media_file) -> float:
+    result = subprocess.run([get_ffmpeg_exe(), "-hide_banner", "-i", str(media_file)], stderr=subprocess.PIPE)
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", result.stderr.decode('utf-8', errors='replace'))
+    if match is None:
+        raise RuntimeError(f"メディアの長さを取得できません: {media_file}")
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
@@ -1,10 +1,11 @@
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
-from moviepy.editor import ColorClip, ImageClip, CompositeVideoClip, vfx
 import os
-import json
 import unicodedata
-import emoji
+from functools import lru_cache
+from typing import NamedTuple
+
+from utils import load_characters
 
 FONT_PATHS = [
     "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
@@ -12,7 +13,6 @@ FONT_PATHS = [
     "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
     "/usr/share/fonts/truetype/fonts-japanese-gothic.ttf"
 ]
-CHARACTER_DATA_FILE = "config/characters.json"
 DEFAULT_COLOR = (255, 255, 255)
 TITLE_SHADOW_COLOR = (50, 50, 50)
 FONT_SIZE = 36
@@ -25,7 +25,13 @@ MARGIN = {
 BUBBLE_RADIUS = 10
 SHADOW_OFFSET = 15
 NAME_OUTLINE_WIDTH = 6
+TITLE_SHADOW_WIDTH = 2
+FONT_CACHE_SIZE = 8
+SPRITE_CACHE_SIZE = 32
 ANIMATION_DURATION = 0.5
+FPS = 24
+X264_PARAMS = ["-tune", "animation"]
+SEGMENT_PARAMS = X264_PARAMS + ["-profile:v", "high"]
 TEXT_WRAP_WIDTH = {
     'VERTICAL': 30,
     'HORIZONTAL': 60,
@@ -33,6 +39,22 @@ TEXT_WRAP_WIDTH = {
 }
 TITLE_VERTICAL_POSITION = 75
 
+class RenderProfile(NamedTuple):
+    scale: float
+    fps: int
+    preset: str
+    bitrate: str
+    emotion_effects: bool
+
+FINAL_PROFILE = RenderProfile(scale=1.0, fps=FPS, preset="medium", bitrate="5000k", emotion_effects=True)
+DRAFT_PROFILE = RenderProfile(scale=0.5, fps=12, preset="ultrafast", bitrate="1000k", emotion_effects=False)
+
+def get_render_profile(draft=False):
+    return DRAFT_PROFILE if draft else FINAL_PROFILE
+
+def scaled(value, scale):
+    return max(1, int(round(value * scale)))
+
 EMOJI_EMOTION_MAP = {
     "😊": "happy", "😂": "happy", "😆": "happy", "😃": "happy", "😄": "happy",
     "😁": "happy", "😅": "happy", "😎": "happy", "😋": "happy", "🤗": "happy",
@@ -51,41 +73,71 @@ EMOJI_EMOTION_MAP = {
     "😏": "smug", "😉": "smug", "💪": "smug",
 }
 
-def apply_emotion_effect(clip, emotion):
-    effects = {
-        "happy": lambda c: c.fx(vfx.colorx, 1.1).fx(vfx.gamma_corr, 1.1).fx(vfx.rotate, lambda t: np.sin(t * 2)),
-        "sad": lambda c: c.fx(vfx.colorx, 0.9),
-        "angry": lambda c: c.fx(vfx.colorx, 1.2).fx(vfx.lum_contrast, 0, 0, 2.0).fx(vfx.gamma_corr, 0.8),
-        "surprised": lambda c: c.fx(vfx.colorx, 1.1).fx(vfx.lum_contrast, 0, 0, 1.5),
-        "embarrassed": lambda c: c.fx(vfx.colorx, 0.8).fx(vfx.gamma_corr, 0.8),
-        "love": lambda c: c.fx(vfx.colorx, 1.1).fx(vfx.gamma_corr, 1.2).fx(vfx.rotate, lambda t: np.sin(t * 8)),
-        "tired": lambda c: c.fx(vfx.colorx, 0.5).fx(vfx.lum_contrast, 0, 0, 0.5),
-        "thinking": lambda c: c.fx(vfx.lum_contrast, 0, 0, 2.0),
-        "neutral": lambda c: c,
-        "confused": lambda c: c.fx(vfx.colorx, 0.95).fx(vfx.lum_contrast, 0, 0, 1.0).fx(vfx.rotate, lambda t: 2 * np.sin(t * 8)),
-        "worried": lambda c: c.fx(vfx.colorx, 0.6).fx(vfx.lum_contrast, 0, 0, 0.5),
-        "unimpressed": lambda c: c.fx(vfx.colorx, 0.9).fx(vfx.lum_contrast, -0.3, 0, 0.8),
-        "smug": lambda c: c.fx(vfx.colorx, 1.2).fx(vfx.gamma_corr, 1.1),
-    }
-    return effects.get(emotion, lambda c: c)(clip)
+EMOTION_COLOR_EFFECTS = {
+    "happy": [("colorx", 1.1), ("gamma_corr", 1.1)],
+    "sad": [("colorx", 0.9)],
+    "angry": [("colorx", 1.2), ("lum_contrast", 0, 0, 2.0), ("gamma_corr", 0.8)],
+    "surprised": [("colorx", 1.1), ("lum_contrast", 0, 0, 1.5)],
+    "embarrassed": [("colorx", 0.8), ("gamma_corr", 0.8)],
+    "love": [("colorx", 1.1), ("gamma_corr", 1.2)],
+    "tired": [("colorx", 0.5), ("lum_contrast", 0, 0, 0.5)],
+    "thinking": [("lum_contrast", 0, 0, 2.0)],
+    "neutral": [],
+    "confused": [("colorx", 0.95), ("lum_contrast", 0, 0, 1.0)],
+    "worried": [("colorx", 0.6), ("lum_contrast", 0, 0, 0.5)],
+    "unimpressed": [("colorx", 0.9), ("lum_contrast", -0.3, 0, 0.8)],
+    "smug": [("colorx", 1.2), ("gamma_corr", 1.1)],
+}
+EMOTION_ROTATIONS = {
+    "happy": (1, 2),
+    "love": (1, 8),
+    "confused": (2, 8),
+}
 
-def analyze_emotions(text):
-    return {EMOJI_EMOTION_MAP[char] for char in text if char in EMOJI_EMOTION_MAP}
+def rotation_angle(emotions):
+    rotations = [EMOTION_ROTATIONS[emotion] for emotion in emotions if emotion in EMOTION_ROTATIONS]
+    if not rotations:
+        return None
+    return lambda t: sum(amplitude * np.sin(t * speed) for amplitude, speed in rotations)
 
-def load_character_data():
-    with open(CHARACTER_DATA_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+def max_rotation(emotions):
+    return sum(EMOTION_ROTATIONS[emotion][0] for emotion in emotions if emotion in EMOTION_ROTATIONS)
+
+def color_effect_table(emotions):
+    table = np.arange(256, dtype=np.float64)
+    for emotion in emotions:
+        for effect, *params in EMOTION_COLOR_EFFECTS.get(emotion, []):
+            if effect == "colorx":
+                table = np.minimum(255, params[0] * table).astype("uint8")
+            elif effect == "gamma_corr":
+                table = (255 * (1.0 * table / 255) ** params[0]).astype("uint8")
+            elif effect == "lum_contrast":
+                lum, contrast, contrast_thr = params
+                table = 1.0 * table
+                table = np.clip(table + lum + contrast * (table - float(contrast_thr)), 0, 255).astype("uint8")
+    return table.astype("uint8")
+
+def bake_color_effects(img, emotions):
+    baked = img.copy()
+    baked[..., :3] = color_effect_table(emotions)[img[..., :3]]
+    return baked
 
-CHARACTER_DATA = load_character_data()
+def analyze_emotions(text):
+    return {EMOJI_EMOTION_MAP[char] for char in text if char in EMOJI_EMOTION_MAP}
 
+@lru_cache(maxsize=None)
 def find_font():
     for font_path in FONT_PATHS:
         if os.path.exists(font_path):
             return font_path
     raise FileNotFoundError("適切な日本語フォントが見つかりません。")
 
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def load_font(font_path, font_size):
+    return ImageFont.truetype(font_path, font_size)
+
 def get_character_color(character):
-    color_data = CHARACTER_DATA.get(character, {}).get("color", DEFAULT_COLOR)
+    color_data = load_characters().get(character, {}).get("color", DEFAULT_COLOR)
     return tuple(map(int, color_data[:3])) if isinstance(color_data, list) and len(color_data) >= 3 else DEFAULT_COLOR
 
 def is_fullwidth(char):
@@ -105,25 +157,34 @@ def wrap_text(text, width):
         lines.append(line)
     return lines
 
-def draw_bubble_with_shadow(draw, x, y, width, height, shadow_color, bubble_color):
-    draw.rounded_rectangle([x + SHADOW_OFFSET, y + SHADOW_OFFSET,
-                            x + width + SHADOW_OFFSET, y + height + SHADOW_OFFSET],
-                           radius=BUBBLE_RADIUS, fill=shadow_color)
+def draw_bubble_with_shadow(draw, x, y, width, height, shadow_color, bubble_color, scale=1.0):
+    shadow_offset, radius = scaled(SHADOW_OFFSET, scale), scaled(BUBBLE_RADIUS, scale)
+    draw.rounded_rectangle([x + shadow_offset, y + shadow_offset,
+                            x + width + shadow_offset, y + height + shadow_offset],
+                           radius=radius, fill=shadow_color)
     draw.rounded_rectangle([x, y, x + width, y + height],
-                           radius=BUBBLE_RADIUS, fill=bubble_color, outline=bubble_color, width=2)
-
-def draw_character_name(draw, character, font, x, y, outline_color, text_color):
+                           radius=radius, fill=bubble_color, outline=bubble_color, width=scaled(2, scale))
+
+@lru_cache(maxsize=SPRITE_CACHE_SIZE)
+def create_name_plate(character, font_path, font_size, outline_color, text_color, outline_width=NAME_OUTLINE_WIDTH):
+    font = load_font(font_path, font_size)
+    left, top, right, bottom = font.getbbox(character, stroke_width=outline_width)
+    plate = Image.new('RGBA', (right - left, bottom - top), (0, 0, 0, 0))
+    ImageDraw.Draw(plate).text((-left, -top), character, font=font, fill=text_color,
+                               stroke_width=outline_width, stroke_fill=outline_color)
+    return plate, (left, top)
+
+def draw_character_name(img, character, font_path, font_size, x, y, outline_color, text_color, outline_width=NAME_OUTLINE_WIDTH):
+    font = load_font(font_path, font_size)
+    plate, (left, top) = create_name_plate(character, font_path, font_size, outline_color, text_color, outline_width)
     name_pos = (x - font.getbbox(character)[2] // 2, y)
-    for offset_x in range(-NAME_OUTLINE_WIDTH, NAME_OUTLINE_WIDTH + 1):
-        for offset_y in range(-NAME_OUTLINE_WIDTH, NAME_OUTLINE_WIDTH + 1):
-            if offset_x != 0 or offset_y != 0:
-                draw.text((name_pos[0] + offset_x, name_pos[1] + offset_y), character, font=font, fill=outline_color)
-    draw.text(name_pos, character, font=font, fill=text_color)
-
-def create_text_image(text, character, font_size, font_path, size, emotions, is_vertical=False):
-    font = ImageFont.truetype(font_path, font_size)
-    character_font = ImageFont.truetype(font_path, font_size + FONT_SIZE_INCREASE)
-    img = Image.new('RGB', size, (0, 0, 0))
+    img.alpha_composite(plate, dest=(max(0, name_pos[0] + left), max(0, name_pos[1] + top)))
+
+def create_text_image(text, character, font_size, font_path, size, emotions, is_vertical=False, scale=1.0):
+    font = load_font(font_path, scaled(font_size, scale))
+    character_font = load_font(font_path, scaled(font_size + FONT_SIZE_INCREASE, scale))
+    margin = {key: scaled(value, scale) for key, value in MARGIN.items()}
+    img = Image.new('RGBA', size, (0, 0, 0, 0))
     draw = ImageDraw.Draw(img)
 
     character_color = tuple(int(c * 0.8) for c in get_character_color(character))
@@ -137,32 +198,34 @@ def create_text_image(text, character, font_size, font_path, size, emotions, is_
     text_width = max(font.getbbox(line)[2] for line in lines)
     text_height = len(lines) * line_height
 
-    bubble_width = text_width + MARGIN['HORIZONTAL'] * 2
-    bubble_height = text_height + MARGIN['VERTICAL'] * 3
+    bubble_width = text_width + margin['HORIZONTAL'] * 2
+    bubble_height = text_height + margin['VERTICAL'] * 3
 
     bubble_x = (size[0] - bubble_width) // 2
     bubble_y = (size[1] - bubble_height) // 2
 
     if not is_vertical:
-        bubble_y += TITLE_VERTICAL_POSITION
+        bubble_y += scaled(TITLE_VERTICAL_POSITION, scale)
 
-    name_x, name_y = size[0] // 2, bubble_y - character_font.getbbox(character)[3] - MARGIN['VERTICAL'] - MARGIN['CHARACTER_NAME']
+    name_x, name_y = size[0] // 2, bubble_y - character_font.getbbox(character)[3] - margin['VERTICAL'] - margin['CHARACTER_NAME']
 
-    draw_bubble_with_shadow(draw, bubble_x, bubble_y, bubble_width, bubble_height, shadow_color, character_color)
+    draw_bubble_with_shadow(draw, bubble_x, bubble_y, bubble_width, bubble_height, shadow_color, character_color, scale)
 
-    x_text, y_text = bubble_x + MARGIN['HORIZONTAL'], bubble_y + MARGIN['VERTICAL']
+    x_text, y_text = bubble_x + margin['HORIZONTAL'], bubble_y + margin['VERTICAL']
     for line in lines:
         draw.text((x_text, y_text), line, font=font, fill=text_color)
         y_text += line_height
 
-    draw_character_name(draw, character, character_font, name_x, name_y, character_color, text_color)
+    draw_character_name(img, character, font_path, scaled(font_size + FONT_SIZE_INCREASE, scale), name_x, name_y, character_color,
+                        text_color, scaled(NAME_OUTLINE_WIDTH, scale))
 
-    return np.array(img)
+    return crop_sprite(img)
 
-def create_title_image(title, font_path, font_size, size):
+@lru_cache(maxsize=SPRITE_CACHE_SIZE)
+def create_title_image(title, font_path, font_size, size, scale=1.0):
     img = Image.new('RGBA', size, (0, 0, 0, 0))
     draw = ImageDraw.Draw(img)
-    title_font = ImageFont.truetype(font_path, font_size + FONT_SIZE_INCREASE)
+    title_font = load_font(font_path, scaled(font_size + FONT_SIZE_INCREASE, scale))
 
     wrap_width = TEXT_WRAP_WIDTH['VERTICAL'] if size[0] < size[1] else TEXT_WRAP_WIDTH['TITLE']
     title_lines = wrap_text(title, width=wrap_width)
@@ -171,24 +234,26 @@ def create_title_image(title, font_path, font_size, size):
     for i, line in enumerate(title_lines):
         title_width = title_font.getbbox(line)[2]
         title_x = (size[0] - title_width) // 2
-        title_pos = (title_x, TITLE_VERTICAL_POSITION + i * line_height)
+        title_pos = (title_x, scaled(TITLE_VERTICAL_POSITION, scale) + i * line_height)
 
-        for offset_x in range(-2, 3):
-            for offset_y in range(-2, 3):
-                if offset_x != 0 or offset_y != 0:
-                    draw.text((title_pos[0] + offset_x, title_pos[1] + offset_y), line, font=title_font, fill=TITLE_SHADOW_COLOR)
+        draw.text(title_pos, line, font=title_font, fill=DEFAULT_COLOR,
+                  stroke_width=scaled(TITLE_SHADOW_WIDTH, scale), stroke_fill=TITLE_SHADOW_COLOR)
 
-        draw.text(title_pos, line, font=title_font, fill=DEFAULT_COLOR)
+    title_img, position = crop_sprite(img)
+    title_img.flags.writeable = False
+    return title_img, position
 
-    return np.array(img)
+def crop_sprite(img):
+    left, top, right, bottom = img.getchannel('A').getbbox() or (0, 0, 1, 1)
+    return np.array(img.crop((left, top, right, bottom))), (left, top)
 
-def add_animation(clip, animation_type, is_vertical=False):
+def add_animation(clip, animation_type, is_vertical=False, position=(0, 0), scale=1.0):
+    from moviepy.editor import vfx
     clip = clip.fx(vfx.fadeout, ANIMATION_DURATION).fx(vfx.fadein, ANIMATION_DURATION)
     if animation_type == "fade":
-        return clip
+        return clip.set_position(position)
 
-    axis = 1 if is_vertical else 0
-    size = 1280 if axis == 0 else 720
+    size = get_frame_size(is_vertical, scale)[0]
 
     animations = {
         "slide_right": lambda t: (0, min(0, size * (t/ANIMATION_DURATION - 1))),
@@ -197,36 +262,82 @@ def add_animation(clip, animation_type, is_vertical=False):
         "slide_bottom": lambda t: (min(0, size * (t/ANIMATION_DURATION - 1)), 0)
     }
 
-    return clip.set_position(animations.get(animation_type, lambda t: (0, 0)))
+    offset = animations.get(animation_type, lambda t: (0, 0))
+    return clip.set_position(lambda t: tuple(base + delta for base, delta in zip(position, offset(t))))
 
-def create_video_with_subtitles(subtitle_text, character, duration=5, output_file="output_with_subtitles.mp4",
-                                animation_type="fade", is_vertical=False, title=""):
-    size = (720, 1280) if is_vertical else (1280, 720)
-    font_path = find_font()
+def flatten_on_black(sprite):
+    alpha = sprite[..., 3:4].astype(np.uint16)
+    return (sprite[..., :3] * alpha // 255).astype(np.uint8)
+
+def pad_for_rotation(sprite, position, emotions):
+    height, width = sprite.shape[:2]
+    spread = np.sin(np.radians(max_rotation(emotions))) / 2
+    pad_x = int(np.ceil(height * spread)) + 1
+    pad_y = int(np.ceil(width * spread)) + 1
+    padded = np.pad(sprite, ((pad_y, pad_y), (pad_x, pad_x), (0, 0)))
+    return padded, (position[0] - pad_x, position[1] - pad_y)
+
+def freeze_interval(clip, start, end):
+    if end <= start:
+        return clip
+    frame = clip.get_frame(start)
+    return clip.fl(lambda get_frame, t: frame if start <= t < end else get_frame(t))
+
+def get_frame_size(is_vertical=False, scale=1.0):
+    width, height = (720, 1280) if is_vertical else (1280, 720)
+    return int(width * scale) // 2 * 2, int(height * scale) // 2 * 2
 
+def create_subtitle_image(subtitle_text, character, is_vertical=False, draft=False):
+    import emoji
+    profile = get_render_profile(draft)
     clean_subtitle_text = emoji.replace_emoji(subtitle_text, replace="").strip()
-    clean_title = emoji.replace_emoji(title, replace="").strip()
-    
-    emotions = analyze_emotions(subtitle_text)
+    emotions = analyze_emotions(subtitle_text) if profile.emotion_effects else set()
     print(f"感情: {emotions}")
 
+    size = get_frame_size(is_vertical, profile.scale)
+    sprite, position = create_text_image(clean_subtitle_text, character, FONT_SIZE, find_font(), size, emotions, is_vertical, profile.scale)
+    return bake_color_effects(sprite, emotions), position, emotions
+
+def create_title_overlay(title, is_vertical=False, draft=False):
+    import emoji
+    scale = get_render_profile(draft).scale
+    clean_title = emoji.replace_emoji(title, replace="").strip()
+    if not clean_title:
+        return None
+    return create_title_image(clean_title, find_font(), FONT_SIZE, get_frame_size(is_vertical, scale), scale)
+
+def create_video_with_subtitles(subtitle_text, character, duration=5, output_file="output_with_subtitles.mp4",
+                                animation_type="fade", is_vertical=False, title="", draft=False):
+    from moviepy.editor import ColorClip, CompositeVideoClip, ImageClip, vfx
+    profile = get_render_profile(draft)
+    size = get_frame_size(is_vertical, profile.scale)
+
     background = ColorClip(size=size, color=(0, 0, 0)).set_duration(duration)
-    text_img = create_text_image(clean_subtitle_text, character, FONT_SIZE, font_path, size, emotions, is_vertical)
-    text_clip = ImageClip(text_img).set_duration(duration)
-    animated_text_clip = add_animation(text_clip, animation_type, is_vertical)
+    sprite, position, emotions = create_subtitle_image(subtitle_text, character, is_vertical, draft)
 
-    for emotion in emotions:
-        animated_text_clip = apply_emotion_effect(animated_text_clip, emotion)
+    angle = rotation_angle(emotions)
+    if angle is None:
+        text_clip = ImageClip(flatten_on_black(sprite)).set_duration(duration)
+    else:
+        sprite, position = pad_for_rotation(sprite, position, emotions)
+        text_clip = ImageClip(flatten_on_black(sprite)).set_duration(duration).fx(vfx.rotate, angle, expand=False)
+    animated_text_clip = add_animation(text_clip, animation_type, is_vertical, position, profile.scale)
 
     clips = [background, animated_text_clip]
 
-    if clean_title:
-        title_img = create_title_image(clean_title, font_path, FONT_SIZE, size)
-        title_clip = ImageClip(title_img).set_duration(duration)
+    title_overlay = create_title_overlay(title, is_vertical, draft)
+    if title_overlay is not None:
+        title_img, title_position = title_overlay
+        title_clip = ImageClip(title_img).set_duration(duration).set_position(title_position)
         clips.append(title_clip)
 
-    final_clip = CompositeVideoClip(clips)
-    final_clip.write_videofile(output_file, fps=24)
+    final_clip = CompositeVideoClip(clips, size=size)
+    if angle is None:
+        final_clip = freeze_interval(final_clip, ANIMATION_DURATION, duration - ANIMATION_DURATION)
+    frames = max(1, round(duration * profile.fps))
+    final_clip = final_clip.set_duration((frames - 0.5) / profile.fps)
+    final_clip.write_videofile(output_file, fps=profile.fps, codec="libx264", bitrate=profile.bitrate, preset=profile.preset,
+                               ffmpeg_params=SEGMENT_PARAMS)
 
     print(f"テロップ付き動画が生成されました: {output_file}")
 
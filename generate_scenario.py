@@ -2,9 +2,9 @@ import os
 import json
 import argparse
 import random
-from content_loader import ContentLoader
 from typing import List, Tuple
-from utils import APIKeyManager, GeminiHandler
+from tracing import span
+from utils import APIKeyManager, GeminiHandler, load_characters
 
 CONFIG_DIR = 'config'
 OUTPUT_DIR = 'output'
@@ -15,7 +15,6 @@ def load_json_config(filename: str) -> dict:
     with open(config_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-characters = load_json_config('characters.json')
 character_interactions = load_json_config('character_interactions.json')
 
 spelling_corrections = {
@@ -41,6 +40,7 @@ class DialogueGenerator:
 
     def generate_dialogue(self, content: str, char1: str, char2: str, mode: int) -> List[Tuple[str, str]]:
         char1_call, char2_call = self.get_character_interaction(char1, char2)
+        characters = load_characters()
 
         if mode in [5, 6]:
             dialogue_type = "商品を情報を正確に紹介する"
@@ -91,7 +91,8 @@ if mode in [2, 4, 6] else "会話は必ず3回のやりとりまでに制限す
 
         for retry in range(3):
             try:
-                response = GeminiHandler.generate_content(prompt)
+                with span("gemini", "request", attempt=retry + 1):
+                    response = GeminiHandler.generate_content(prompt)
                 dialogue = []
                 for line in response.strip().split('\n'):
                     if ':' in line:
@@ -120,10 +121,13 @@ class ScenarioGenerator:
         self.dialogue_generator = DialogueGenerator(self.api_key)
 
     def generate_scenario(self, url_or_file: str, char1: str, char2: str, mode: int) -> List[Tuple[str, str]]:
+        from content_loader import ContentLoader
         content_loader = ContentLoader()
-        content = content_loader.load_content(url_or_file)
+        with span("load_content", "scenario"):
+            content = content_loader.load_content(url_or_file)
 
-        dialogue = self.dialogue_generator.generate_dialogue(content, char1, char2, mode)
+        with span("generate_dialogue", "scenario"):
+            dialogue = self.dialogue_generator.generate_dialogue(content, char1, char2, mode)
 
         print("\n生成された対話:")
         for speaker, text in dialogue:
@@ -142,6 +146,7 @@ def main():
 
     args = parser.parse_args()
 
+    characters = load_characters()
     available_characters = list(characters.keys())
     if not args.char1:
         args.char1 = random.choice(available_characters)
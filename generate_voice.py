@@ -1,78 +1,191 @@
-import requests
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Any, Iterator, List, NamedTuple, Optional, Tuple, Union
 import json
-import os
-from pydub import AudioSegment
-from typing import Union, Dict, Any
-import emoji
 
-CHARACTERS_JSON = "./config/characters.json"
+from audio_processing import concatenate_wavs, decode_wav, pad_silence, write_wav
+from voicevox_client import VoicevoxClient, get_client, get_concurrency
+from synthesis_cache import get_audio_cache, get_query_cache, make_key
+from tracing import traced
+from utils import load_characters
 
-def generate_voice(text: str, character_name: str, output_file: str = "output.wav") -> None:
-    voicevox_api_host = os.getenv('VOICEVOX_API_HOST', 'localhost')
-    if not voicevox_api_host:
-        raise ValueError("VOICEVOX_API_HOST environment variable is not set.")
-    base_url = f"http://{voicevox_api_host}:50021"
+CHUNK_MIN_MORAS = 40
+
+_emoji_lock = threading.Lock()
 
-    text = emoji.replace_emoji(text.replace("。", "。 ").replace("、", "、 "), replace="").strip()
+class SynthesisPlan(NamedTuple):
+    speaker_id: int
+    cache_key: Optional[str]
+    audio: Optional[bytes]
+    chunks: List[Dict[str, Any]]
 
+def generate_voice(text: str, character_name: str, output_file: str = "output.wav") -> None:
+    audio_data = synthesize(text, character_name)
+    if audio_data is None:
+        return
+
+    save_audio(audio_data, output_file)
+    print(f"音声ファイルが生成されました: {output_file}")
+
+def synthesize(text: str, character_name: str, client: Optional[VoicevoxClient] = None) -> Optional[bytes]:
+    client = client or get_client()
+    plan = plan_synthesis(normalize_text(text), character_name, client)
+    if plan.audio is not None or not plan.chunks:
+        return plan.audio
+    return finish_synthesis(plan, [client.synthesis(chunk, plan.speaker_id) for chunk in plan.chunks])
+
+def normalize_text(text: str) -> str:
+    import emoji
+    with _emoji_lock:
+        return emoji.replace_emoji(text.replace("。", "。 ").replace("、", "、 "), replace="").strip()
+
+def plan_synthesis(text: str, character_name: str, client: VoicevoxClient) -> SynthesisPlan:
     character_config = load_character_config(character_name)
+    speaker_id = character_config["speaker_id"]
+    prosody = get_prosody(character_config)
 
-    query_payload = {"text": text, "speaker": character_config["speaker_id"]}
-    query_data = send_request(f"{base_url}/audio_query", method="POST", params=query_payload)
+    cache_key = None
+    audio_cache = get_audio_cache()
+    if audio_cache is not None:
+        cache_key = make_key(text=text, speaker=speaker_id, prosody=prosody, user_dict=client.user_dict_hash())
+        cached_audio = audio_cache.get(cache_key)
+        if cached_audio is not None:
+            return SynthesisPlan(speaker_id, cache_key, cached_audio, [])
 
-    if isinstance(query_data, dict):
-        query_data.update({
-            "speedScale": character_config["speed_scale"],
-            "volumeScale": character_config["volume_scale"],
-            "intonationScale": character_config["intonation_scale"],
-            "prePhonemeLength": character_config["pre_phoneme_length"],
-            "postPhonemeLength": character_config["post_phoneme_length"],
-            "emphasisScale": character_config["emphasis_scale"],
-            "breathScale": character_config["breath_scale"]
-        })
-
-        synthesis_payload = {"speaker": character_config["speaker_id"]}
-        audio_data = send_request(
-            f"{base_url}/synthesis",
-            method="POST",
-            params=synthesis_payload,
-            data=json.dumps(query_data),
-            headers={"Content-Type": "application/json"}
-        )
-
-        if isinstance(audio_data, bytes):
-            save_audio(audio_data, output_file)
-            print(f"音声ファイルが生成されました: {output_file}")
-        else:
-            print("音声データの取得に失敗しました。")
-    else:
-        print("音声クエリの作成に失敗しました。")
+    query_data = get_audio_query(client, text, speaker_id)
 
-def send_request(url: str, method: str = "GET", **kwargs) -> Union[Dict[str, Any], bytes]:
-    try:
-        response = requests.request(method, url, **kwargs)
-        response.raise_for_status()
-        return response.json() if response.headers.get('content-type') == 'application/json' else response.content
-    except requests.exceptions.ConnectionError:
-        raise SystemExit("エラー: VOICEVOXのDockerコンテナが起動しているか確認してください。")
-    except requests.exceptions.RequestException as e:
-        raise SystemExit(f"エラー: リクエスト中に問題が発生しました: {e}")
+    if not isinstance(query_data, dict):
+        print("音声クエリの作成に失敗しました。")
+        return SynthesisPlan(speaker_id, cache_key, None, [])
+
+    query_data.update(prosody)
+    return SynthesisPlan(speaker_id, cache_key, None, split_query(query_data))
+
+def split_query(query_data: Dict[str, Any], min_moras: int = CHUNK_MIN_MORAS) -> List[Dict[str, Any]]:
+    groups: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    mora_count = 0
+    for phrase in query_data.get("accent_phrases", []):
+        current.append(dict(phrase))
+        mora_count += len(phrase.get("moras", []))
+        if phrase.get("pause_mora") and mora_count >= min_moras:
+            groups.append(current)
+            current, mora_count = [], 0
+    if current:
+        groups.append(current)
+
+    if len(groups) <= 1:
+        return [query_data]
+
+    chunks = []
+    lead_silence = query_data["prePhonemeLength"]
+    for i, phrases in enumerate(groups):
+        chunk = dict(query_data, accent_phrases=phrases, prePhonemeLength=lead_silence)
+        if i < len(groups) - 1:
+            pause = get_pause_length(query_data, phrases[-1]["pause_mora"])
+            phrases[-1]["pause_mora"] = None
+            chunk["postPhonemeLength"] = lead_silence = pause / 2
+        chunks.append(chunk)
+    return chunks
+
+def get_pause_length(query_data: Dict[str, Any], pause_mora: Dict[str, Any]) -> float:
+    pause = query_data.get("pauseLength")
+    if pause is None:
+        pause = pause_mora["vowel_length"]
+    return pause * query_data.get("pauseLengthScale", 1.0)
+
+def finish_synthesis(plan: SynthesisPlan, chunk_audio: List[Union[Dict[str, Any], bytes]]) -> Optional[bytes]:
+    if not all(isinstance(audio, bytes) for audio in chunk_audio):
+        print("音声データの取得に失敗しました。")
+        return None
+
+    audio_data = chunk_audio[0] if len(chunk_audio) == 1 else concatenate_wavs(chunk_audio)
+
+    audio_cache = get_audio_cache()
+    if audio_cache is not None and plan.cache_key is not None:
+        audio_cache.put(plan.cache_key, audio_data)
+    return audio_data
+
+def get_audio_query(client: VoicevoxClient, text: str, speaker_id: int) -> Union[Dict[str, Any], bytes]:
+    query_cache = get_query_cache()
+    if query_cache is None:
+        return client.audio_query(text, speaker_id)
+
+    cache_key = make_key(text=text, speaker=speaker_id, user_dict=client.user_dict_hash())
+    cached_query = query_cache.get(cache_key)
+    if cached_query is not None:
+        return json.loads(cached_query)
+
+    query_data = client.audio_query(text, speaker_id)
+    if isinstance(query_data, dict):
+        query_cache.put(cache_key, json.dumps(query_data, ensure_ascii=False).encode('utf-8'))
+    return query_data
+
+def get_prosody(character_config: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "speedScale": character_config["speed_scale"],
+        "volumeScale": character_config["volume_scale"],
+        "intonationScale": character_config["intonation_scale"],
+        "prePhonemeLength": character_config["pre_phoneme_length"],
+        "postPhonemeLength": character_config["post_phoneme_length"],
+        "emphasisScale": character_config["emphasis_scale"],
+        "breathScale": character_config["breath_scale"]
+    }
+
+def synthesize_iter(lines: List[Tuple[str, str]], max_workers: Optional[int] = None,
+                    cancel_event: Optional[threading.Event] = None) -> Iterator[Tuple[int, Optional[bytes]]]:
+    client = get_client()
+    max_workers = max_workers or get_concurrency()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: Dict[Future, Tuple[int, int]] = {
+            executor.submit(traced(plan_synthesis, "plan_synthesis", line=index + 1), normalize_text(text), character, client): (index, -1)
+            for index, (character, text) in enumerate(lines)
+        }
+        plans: Dict[int, SynthesisPlan] = {}
+        chunk_audio: Dict[int, List[Union[Dict[str, Any], bytes, None]]] = {}
+        remaining: Dict[int, int] = {}
+
+        try:
+            while pending:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, chunk_index = pending.pop(future)
+                    if chunk_index < 0:
+                        plan = future.result()
+                        if plan.audio is not None or not plan.chunks:
+                            yield index, plan.audio
+                            continue
+                        plans[index] = plan
+                        chunk_audio[index] = [None] * len(plan.chunks)
+                        remaining[index] = len(plan.chunks)
+                        for n, chunk in enumerate(plan.chunks):
+                            synthesis = traced(client.synthesis, "synthesis", line=index + 1, chunk=n)
+                            pending[executor.submit(synthesis, chunk, plan.speaker_id)] = (index, n)
+                    else:
+                        chunk_audio[index][chunk_index] = future.result()
+                        remaining[index] -= 1
+                        if remaining[index] == 0:
+                            del remaining[index]
+                            yield index, finish_synthesis(plans.pop(index), chunk_audio.pop(index))
+        finally:
+            for future in pending:
+                future.cancel()
+
+def synthesize_many(lines: List[Tuple[str, str]], max_workers: Optional[int] = None,
+                    cancel_event: Optional[threading.Event] = None) -> List[Optional[bytes]]:
+    results: List[Optional[bytes]] = [None] * len(lines)
+    for index, audio_data in synthesize_iter(lines, max_workers=max_workers, cancel_event=cancel_event):
+        results[index] = audio_data
+    return results
 
 def save_audio(audio_data: bytes, output_file: str) -> None:
-    temp_file = "temp_output.wav"
-    with open(temp_file, "wb") as f:
-        f.write(audio_data)
-
-    sound = AudioSegment.from_wav(temp_file)
-    silence = AudioSegment.silent(duration=300)
-    (sound + silence).export(output_file, format="wav")
-
-    os.remove(temp_file)
+    write_wav(pad_silence(decode_wav(audio_data)), output_file)
 
 def load_character_config(character_name: str) -> Dict[str, Any]:
-    with open(CHARACTERS_JSON, "r", encoding="utf-8") as f:
-        characters = json.load(f)
-
+    characters = load_characters()
     if character_name not in characters:
         raise ValueError(f"キャラクター '{character_name}' は設定ファイルに見つかりません。")
 
@@ -1,144 +1,259 @@
+from __future__ import annotations
+
 import argparse
+import hashlib
 import os
 import shutil
-import json
-import base64
-import tempfile
-from typing import List, Tuple, Dict, Optional
+import subprocess
+import sys
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from multiprocessing import get_context
+from typing import TYPE_CHECKING, List, Tuple, Dict, Optional
 from pathlib import Path
 
-import wave
-import numpy as np
-from scipy import signal
-from moviepy.editor import AudioFileClip, concatenate_videoclips, VideoFileClip, CompositeAudioClip, ColorClip
+from synthesis_cache import (ARTIFACT_SUFFIXES, get_artifact_cache, get_audio_cache, get_query_cache, make_key, pin_run_artifacts,
+                             set_cache_enabled)
+from tracing import TRACE_DIR, enable_tracing, span, submit_traced, traced
+from utils import load_characters
 
-from generate_voice import generate_voice
-from generate_movie import create_video_with_subtitles
-from generate_scenario import ScenarioGenerator
+if TYPE_CHECKING:
+    from audio_processing import LineAudio
+    from bgm_store import BGMTrack
 
-CONFIG_PATH = Path('config/characters.json')
 OUTPUT_DIR = Path('tmp')
 FINAL_OUTPUT = Path('output/final_dialogue_output.mp4')
-BGM_DIR = Path('./bgm/')
-
-def load_character_config() -> Dict:
-    with CONFIG_PATH.open('r', encoding='utf-8') as f:
-        return json.load(f)
-
-CHARACTER_CONFIG = load_character_config()
-
-def create_audio_file(character: str, text: str, output_file: Path) -> None:
-    generate_voice(text, character_name=character, output_file=str(output_file))
-    process_audio_file(output_file)
-
-def process_audio_file(file_path: Path) -> None:
-    with wave.open(str(file_path), 'rb') as wf:
-        params = wf.getparams()
-        data = wf.readframes(wf.getnframes())
-
-    processed_data = remove_noise(data, params.framerate)
-
-    with wave.open(str(file_path), 'wb') as wf:
-        wf.setparams(params)
-        wf.writeframes(processed_data)
-
-def remove_noise(audio_data: bytes, sample_rate: int, cutoff: int = 100, threshold: float = 0.01, 
-                 fade_duration_ms: int = 10, limit_threshold: float = 0.8) -> bytes:
-    audio_array = np.frombuffer(audio_data, dtype=np.int16) / 32768.0
-    nyquist = 0.5 * sample_rate
-    normal_cutoff = cutoff / nyquist
-    b, a = signal.butter(4, normal_cutoff, btype='high', analog=False)
-    audio_array = signal.filtfilt(b, a, audio_array)
-    audio_array = np.where(np.abs(audio_array) > threshold, audio_array, audio_array * 0.1)
-
-    fade_duration = int(fade_duration_ms * sample_rate / 1000)
-    fade_in = np.linspace(0, 1, fade_duration)
-    fade_out = np.linspace(1, 0, fade_duration)
-    audio_array[:fade_duration] *= fade_in
-    audio_array[-fade_duration:] *= fade_out
-
-    audio_array = np.clip(audio_array / np.max(np.abs(audio_array)) * limit_threshold, -1, 1)
-    return (audio_array * 32767.0).astype(np.int16).tobytes()
-
-def create_dialogue_files(dialogue: List[Tuple[str, str]], is_vertical: bool, title: str) -> Tuple[List[Path], List[Path]]:
-    audio_files = []
-    video_files = []
-    animation_types = ["slide_bottom", "fade", "slide_right", "slide_left", "slide_top"]
-
-    for i, (character, text) in enumerate(dialogue, start=1):
-        audio_file = OUTPUT_DIR / f"audio_{i}.wav"
-        video_file = OUTPUT_DIR / f"video_{i}.mp4"
-
-        create_audio_file(character, text, audio_file)
-        audio_duration = AudioFileClip(str(audio_file)).duration
-
-        create_video_with_subtitles(text, character, duration=audio_duration, output_file=str(video_file), 
-                                    animation_type=animation_types[i % len(animation_types)], 
-                                    is_vertical=is_vertical, title=title)
-
-        audio_files.append(audio_file)
-        video_files.append(video_file)
-
-    return audio_files, video_files
-
-def select_bgm(atmosphere: str) -> Path:
-    bgm_files = [f for f in BGM_DIR.iterdir() if f.suffix in ('.bin', '.mp3')]
-    atmosphere_keywords = set(keyword.strip().lower() for keyword in atmosphere.split('、'))
-
-    best_match = None
-    best_match_count = 0
-
-    for bgm_file in bgm_files:
-        bgm_name = bgm_file.stem.lower()
-        bgm_keywords = set(bgm_name.split('_'))
-
-        match_count = len(atmosphere_keywords.intersection(bgm_keywords))
-
-        if match_count > best_match_count:
-            best_match = bgm_file
-            best_match_count = match_count
-
-        if match_count == len(atmosphere_keywords):
-            return bgm_file
-
-    return best_match if best_match else BGM_DIR / 'default.bin'
-
-def decode_bgm(bgm_file: Path) -> str:
-    with bgm_file.open("rb") as f:
-        encoded_data = f.read()
-
-    decoded_data = base64.b64decode(encoded_data)
-
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-    temp_file.write(decoded_data)
-    temp_file.close()
-
-    return temp_file.name
-
-def combine_dialogue_clips(video_files: List[Path], audio_files: List[Path], output_file: Path, bgm_file: Path, is_vertical: bool) -> None:
-    clips = [VideoFileClip(str(video)).set_audio(AudioFileClip(str(audio))) for video, audio in zip(video_files, audio_files)]
-
-    for i, clip in enumerate(clips):
-        clip = clip.audio_fadein(0.1).audio_fadeout(0.3)
-        if i == 0:
-            clip = clip.fadein(0.5)
-        if i == len(clips) - 1:
-            clip = clip.fadeout(0.5)
-        clips[i] = clip
-
-    size = (720, 1280) if is_vertical else (1280, 720)
-    blank_clip = ColorClip(size=size, color=(0, 0, 0)).set_duration(1)
-    final_clip = concatenate_videoclips([blank_clip] + clips + [blank_clip], method="compose")
-
-    bgm = AudioFileClip(str(bgm_file)).volumex(0.1)
-    bgm = bgm.audio_loop(duration=final_clip.duration) if bgm.duration < final_clip.duration else bgm.subclip(0, final_clip.duration)
-    bgm = bgm.audio_fadein(1).audio_fadeout(3)
-
-    final_audio = CompositeAudioClip([final_clip.audio, bgm])
-    final_clip = final_clip.set_audio(final_audio)
-
-    temp_audiofile = OUTPUT_DIR / "final_dialogue_outputTEMP_MPY_wvf_snd.mp4"
-    final_clip.write_videofile(str(output_file), codec="libx264", audio_codec="aac", bitrate="5000k", audio_bitrate="192k", temp_audiofile=str(temp_audiofile))
+DRAFT_OUTPUT = Path('output/draft_dialogue_output.mp4')
+ANIMATION_TYPES = ["slide_bottom", "fade", "slide_right", "slide_left", "slide_top"]
+STARTUP_REPORT_LIMIT = 20
+
+class JobCancelled(Exception):
+    pass
+
+def check_cancelled(cancel_event: Optional[threading.Event]) -> None:
+    if cancel_event is not None and cancel_event.is_set():
+        raise JobCancelled("ジョブがキャンセルされました。")
+
+def create_audio_file(audio_data: Optional[bytes], output_file: Path) -> LineAudio:
+    from audio_processing import SILENCE_PADDING_MS, decode_wav, get_audio_processor, process_line_audio, write_wav
+    if audio_data is None:
+        raise SystemExit(f"エラー: 音声の生成に失敗しました: {output_file}")
+
+    cache = get_artifact_cache("processed")
+    key = make_key(audio=hashlib.sha256(audio_data).hexdigest(), processor=get_audio_processor().settings(),
+                   padding=SILENCE_PADDING_MS)
+    cached = cache.lookup(key) if cache is not None else None
+    if cached is not None:
+        print(f"処理済みの音声を再利用します: {cached}")
+        return decode_wav(cached.read_bytes())
+
+    with span("process_audio", "line", file=output_file.name):
+        line_audio = process_line_audio(audio_data)
+    if cache is not None:
+        partial_path = cache.partial_path(key)
+        write_wav(line_audio, partial_path)
+        output_file = cache.commit(key, partial_path)
+    else:
+        write_wav(line_audio, output_file)
+    print(f"音声ファイルが生成されました: {output_file}")
+    return line_audio
+
+def print_cache_stats() -> None:
+    audio_cache, query_cache = get_audio_cache(), get_query_cache()
+    if audio_cache is not None and query_cache is not None:
+        print(f"音声キャッシュ: {audio_cache.stats()}")
+        print(f"AudioQueryキャッシュ: {query_cache.stats()}")
+
+def print_build_stats() -> None:
+    for stage in ARTIFACT_SUFFIXES:
+        cache = get_artifact_cache(stage)
+        if cache is not None and cache.hits + cache.misses:
+            print(f"中間生成物 ({stage}): {cache.stats()}")
+
+def create_audio_files(dialogue: List[Tuple[str, str]], max_workers: Optional[int] = None, work_dir: Path = OUTPUT_DIR,
+                       cancel_event: Optional[threading.Event] = None) -> List[LineAudio]:
+    from generate_voice import synthesize_many
+    synthesized = synthesize_many(dialogue, max_workers=max_workers, cancel_event=cancel_event)
+    check_cancelled(cancel_event)
+    print_cache_stats()
+
+    return [create_audio_file(audio_data, work_dir / f"audio_{i}.wav")
+            for i, audio_data in enumerate(synthesized, start=1)]
+
+def get_animation_type(index: int) -> str:
+    return ANIMATION_TYPES[index % len(ANIMATION_TYPES)]
+
+def orientation_suffix(is_vertical: bool) -> str:
+    return "_vertical" if is_vertical else ""
+
+def get_output_files(orientations: List[bool], draft: bool = False, output: Optional[str] = None) -> Dict[bool, Path]:
+    base = Path(output) if output else (DRAFT_OUTPUT if draft else FINAL_OUTPUT)
+    if len(orientations) == 1:
+        return {orientations[0]: base}
+    return {is_vertical: base.with_name(f"{base.stem}{orientation_suffix(is_vertical)}{base.suffix}") for is_vertical in orientations}
+
+def get_clip_key(text: str, character: str, duration: float, animation_type: str, is_vertical: bool, title: str, draft: bool) -> str:
+    from generate_movie import SEGMENT_PARAMS, find_font, get_character_color, get_render_profile
+    return make_key(text=text, character=character, color=get_character_color(character), duration=duration,
+                    animation=animation_type, vertical=is_vertical, title=title, profile=list(get_render_profile(draft)),
+                    codec=SEGMENT_PARAMS, font=find_font())
+
+def clip_duration(line_audio: List[Optional[LineAudio]], index: int, fps: int) -> float:
+    from ffmpeg_renderer import frame_durations, line_frame_counts
+    durations = frame_durations([audio.duration for audio in line_audio[:index + 1]])
+    return line_frame_counts(durations, fps)[-1] / fps
+
+def create_render_pool(render_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=render_workers, mp_context=get_context("spawn"))
+
+def use_render_pool(render_pool: Optional[Executor], render_workers: Optional[int] = None):
+    return nullcontext(render_pool) if render_pool is not None else create_render_pool(render_workers)
+
+def create_dialogue_files(dialogue: List[Tuple[str, str]], orientations: List[bool], title: str, max_workers: Optional[int] = None,
+                          render_workers: Optional[int] = None, draft: bool = False,
+                          render_pool: Optional[Executor] = None, work_dir: Path = OUTPUT_DIR,
+                          cancel_event: Optional[threading.Event] = None) -> Tuple[List[LineAudio], Dict[bool, List[Path]]]:
+    from generate_movie import create_video_with_subtitles, get_render_profile
+    from generate_voice import synthesize_iter
+    line_audio: List[Optional[LineAudio]] = [None] * len(dialogue)
+    video_files = {is_vertical: [work_dir / f"video_{i}{orientation_suffix(is_vertical)}.mp4" for i in range(1, len(dialogue) + 1)]
+                   for is_vertical in orientations}
+    clip_cache = get_artifact_cache("clip")
+    fps = get_render_profile(draft).fps
+    next_line = 0
+
+    with use_render_pool(render_pool, render_workers) as render_pool:
+        renders: Dict[Future, Tuple[bool, int, str, Path]] = {}
+        for index, audio_data in synthesize_iter(dialogue, max_workers=max_workers, cancel_event=cancel_event):
+            line_audio[index] = create_audio_file(audio_data, work_dir / f"audio_{index + 1}.wav")
+            while next_line < len(dialogue) and line_audio[next_line] is not None:
+                index, next_line = next_line, next_line + 1
+                duration = clip_duration(line_audio, index, fps)
+                character, text = dialogue[index]
+                animation_type = get_animation_type(index + 1)
+                for is_vertical in orientations:
+                    key = get_clip_key(text, character, duration, animation_type, is_vertical, title, draft)
+                    cached = clip_cache.lookup(key) if clip_cache is not None else None
+                    if cached is not None:
+                        print(f"テロップ動画を再利用します: {cached}")
+                        video_files[is_vertical][index] = cached
+                        continue
+
+                    target = clip_cache.partial_path(key) if clip_cache is not None else video_files[is_vertical][index]
+                    render = submit_traced(render_pool, "render_clip", "line", {"line": index + 1, "vertical": is_vertical},
+                                           create_video_with_subtitles, text, character, duration=duration,
+                                           output_file=str(target), animation_type=animation_type, is_vertical=is_vertical,
+                                           title=title, draft=draft)
+                    renders[render] = (is_vertical, index, key, target)
+        print_cache_stats()
+
+        errors = []
+        for render in as_completed(renders):
+            if cancel_event is not None and cancel_event.is_set():
+                for pending in renders:
+                    pending.cancel()
+            if render.cancelled():
+                continue
+            is_vertical, index, key, target = renders[render]
+            try:
+                render.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            if clip_cache is not None:
+                video_files[is_vertical][index] = clip_cache.commit(key, target)
+        check_cancelled(cancel_event)
+        if errors:
+            raise errors[0]
+
+    return line_audio, video_files
+
+def select_bgm(bgm_file: Optional[str], atmosphere: str) -> BGMTrack:
+    from bgm_store import get_bgm_store
+    return get_bgm_store().add(Path(bgm_file)) if bgm_file else get_bgm_store().select(atmosphere)
+
+def create_soundtrack(line_audio: List[LineAudio], durations: List[float], bgm_track: BGMTrack, duck_bgm: bool = False,
+                      work_dir: Path = OUTPUT_DIR) -> Path:
+    from audio_mixer import mix_soundtrack, write_mix
+    cache = get_artifact_cache("mix")
+    key = make_key(lines=[(hashlib.sha256(audio.to_bytes()).hexdigest(), audio.sample_rate) for audio in line_audio],
+                   durations=durations, bgm=bgm_track.digest, duck=duck_bgm)
+    cached = cache.lookup(key) if cache is not None else None
+    if cached is not None:
+        print(f"ミックス済みの音声を再利用します: {cached}")
+        return cached
+
+    mix = mix_soundtrack(line_audio, bgm_track.load(), durations=durations, duck=duck_bgm)
+    mix_file = cache.partial_path(key) if cache is not None else work_dir / "final_mix.wav"
+    write_mix(mix, mix_file)
+    return cache.commit(key, mix_file) if cache is not None else mix_file
+
+def combine_dialogue_clips(video_files: List[Path], mix_file: Path, output_file: Path, draft: bool = False,
+                           work_dir: Path = OUTPUT_DIR) -> None:
+    from ffmpeg_renderer import concat_segments, encode_edge_segment
+    from generate_movie import get_render_profile
+    profile = get_render_profile(draft)
+
+    intro = work_dir / f"{output_file.stem}_intro.mp4"
+    encode_edge_segment(video_files[0], intro, fade_in=True, fade_out=len(video_files) == 1, profile=profile)
+    segments = [intro]
+    if len(video_files) > 1:
+        outro = work_dir / f"{output_file.stem}_outro.mp4"
+        encode_edge_segment(video_files[-1], outro, fade_in=False, fade_out=True, profile=profile)
+        segments += list(video_files[1:-1]) + [outro]
+
+    concat_segments(segments, mix_file, output_file, work_dir / f"{output_file.stem}_segments.txt")
+
+def combine_all(video_files: Dict[bool, List[Path]], line_audio: List[LineAudio], output_files: Dict[bool, Path],
+                bgm_track: BGMTrack, duck_bgm: bool = False, draft: bool = False, render_pool: Optional[Executor] = None,
+                work_dir: Path = OUTPUT_DIR, cancel_event: Optional[threading.Event] = None) -> None:
+    from ffmpeg_renderer import frame_durations
+    durations = frame_durations([audio.duration for audio in line_audio])
+    with span("soundtrack", "render"):
+        mix_file = create_soundtrack(line_audio, durations, bgm_track, duck_bgm, work_dir)
+    check_cancelled(cancel_event)
+
+    if len(output_files) == 1:
+        for is_vertical, output_file in output_files.items():
+            with span("combine_clips", "render", vertical=is_vertical):
+                combine_dialogue_clips(video_files[is_vertical], mix_file, output_file, draft, work_dir)
+        check_cancelled(cancel_event)
+        return
+
+    with use_render_pool(render_pool, len(output_files)) as pool:
+        futures = [submit_traced(pool, "combine_clips", "render", {"vertical": is_vertical}, combine_dialogue_clips,
+                                 video_files[is_vertical], mix_file, output_file, draft, work_dir)
+                   for is_vertical, output_file in output_files.items()]
+        for future in futures:
+            if cancel_event is not None and cancel_event.is_set():
+                future.cancel()
+            if not future.cancelled():
+                future.result()
+    check_cancelled(cancel_event)
+
+def render_with_ffmpeg(dialogue: List[Tuple[str, str]], line_audio: List[LineAudio], title: str, output_files: Dict[bool, Path],
+                       bgm_track: BGMTrack, duck_bgm: bool = False, draft: bool = False, work_dir: Path = OUTPUT_DIR,
+                       cancel_event: Optional[threading.Event] = None) -> None:
+    from ffmpeg_renderer import frame_durations, render_dialogue_video
+    durations = frame_durations([audio.duration for audio in line_audio])
+    with span("soundtrack", "render"):
+        mix_file = create_soundtrack(line_audio, durations, bgm_track, duck_bgm, work_dir)
+    check_cancelled(cancel_event)
+    animation_types = [get_animation_type(i) for i in range(1, len(dialogue) + 1)]
+
+    def render(is_vertical: bool, output_file: Path) -> None:
+        check_cancelled(cancel_event)
+        layout_dir = work_dir / ("vertical" if is_vertical else "landscape")
+        layout_dir.mkdir(parents=True, exist_ok=True)
+        render_dialogue_video(dialogue, durations, animation_types, title, is_vertical, mix_file, output_file, layout_dir, draft=draft)
+
+    with ThreadPoolExecutor(max_workers=len(output_files)) as pool:
+        futures = [pool.submit(traced(render, "render_ffmpeg", "render", vertical=is_vertical), is_vertical, output_file)
+                   for is_vertical, output_file in output_files.items()]
+        for future in futures:
+            future.result()
+    check_cancelled(cancel_event)
 
 def clean_output_directory(directory: Path) -> None:
     if directory.exists():
@@ -153,7 +268,8 @@ def clean_output_directory(directory: Path) -> None:
 
 def log_parameters(args: argparse.Namespace) -> None:
     print(f"使用するパラメータ:\nURL/ファイル: {args.url_or_file}\nキャラクター1: {args.char1}\nキャラクター2: {args.char2}")
-    print(f"長い対話: {'はい' if args.mode in [2, 4] else 'いいえ'}\n縦型動画: {'はい' if args.vertical else 'いいえ'}")
+    vertical = '横型と縦型の両方' if args.both else ('はい' if args.vertical else 'いいえ')
+    print(f"長い対話: {'はい' if args.mode in [2, 4] else 'いいえ'}\n縦型動画: {vertical}")
 
 def process_scenario(scenario: List[Tuple[str, str]], title: str, atmosphere: str, dialogue: List[Tuple[str, str]]) -> Tuple[str, str, List[Tuple[str, str]]]:
     for item in scenario:
@@ -165,30 +281,70 @@ def process_scenario(scenario: List[Tuple[str, str]], title: str, atmosphere: st
             dialogue.append(item)
     return title, atmosphere, dialogue
 
-def parse_arguments() -> argparse.Namespace:
+def generate_scenario(args: argparse.Namespace) -> List[Tuple[str, str]]:
+    from generate_scenario import ScenarioGenerator
+    log_parameters(args)
+    return ScenarioGenerator().generate_scenario(args.url_or_file, args.char1, args.char2, args.mode)
+
+def profile_startup(argv: List[str]) -> int:
+    command = [sys.executable, "-X", "importtime", os.path.abspath(__file__)] + [arg for arg in argv if arg != "--profile-startup"]
+    result = subprocess.run(command, stderr=subprocess.PIPE, text=True)
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            print(line, file=sys.stderr)
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit() or fields[2].startswith("  "):
+            continue
+        imports.append((int(fields[1]), fields[2].strip()))
+
+    print(f"\n起動時のインポート時間 (上位{STARTUP_REPORT_LIMIT}件、トップレベルのモジュールのみ):")
+    for cumulative, module in sorted(imports, reverse=True)[:STARTUP_REPORT_LIMIT]:
+        print(f"{cumulative / 1000:10.1f} ms  {module}")
+    print(f"{sum(cumulative for cumulative, _ in imports) / 1000:10.1f} ms  合計 ({len(imports)} モジュール)")
+    return result.returncode
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="対話動画生成スクリプト")
     parser.add_argument("url_or_file", help="URLまたはファイルパス")
     parser.add_argument("-c1", "--char1", default="ずんだもん", help="キャラクター1 (デフォルト: ずんだもん)")
     parser.add_argument("-c2", "--char2", default="四国めたん", help="キャラクター2 (デフォルト: 四国めたん)")
     parser.add_argument("-m", "--mode", type=int, choices=[1, 2, 3, 4], default=1, help="対話モード (デフォルト: 1)")
     parser.add_argument("-v", "--vertical", action="store_true", help="縦型動画を生成")
+    parser.add_argument("--both", action="store_true", help="横型と縦型の動画を1回の実行で同時に生成")
     parser.add_argument("-b", "--bgm", help="BGMファイルのパス")
+    parser.add_argument("-o", "--output", help="完成した動画の出力先 (デフォルト: output/final_dialogue_output.mp4)")
+    parser.add_argument("-r", "--renderer", choices=["moviepy", "ffmpeg"], default="moviepy",
+                        help="動画の合成方式 (デフォルト: moviepy、ffmpeg: フィルタグラフによる一括合成)")
+    parser.add_argument("--duck", action="store_true", help="セリフの再生中はBGMの音量を下げる")
+    parser.add_argument("-j", "--jobs", type=int, help="VOICEVOXの同時合成数 (デフォルト: 環境変数VOICEVOX_CONCURRENCYまたは4)")
+    parser.add_argument("-w", "--render-workers", type=int, help="テロップ動画を並列に生成するプロセス数 (デフォルト: CPUコア数)")
+    parser.add_argument("--draft", action="store_true",
+                        help="確認用に低解像度・低フレームレートで高速に書き出す (感情エフェクトなし、タイミングは本番と同じ)")
+    parser.add_argument("--no-cache", action="store_true", help="合成音声キャッシュを使用しない")
+    parser.add_argument("--clean", action="store_true", help="tmp/ の中間生成物をすべて削除してから生成する")
+    parser.add_argument("--profile-startup", action="store_true", help="モジュールごとのインポート時間を計測して表示する")
+    parser.add_argument("--trace", nargs="?", const=str(TRACE_DIR), metavar="DIR",
+                        help=f"処理ごと・セリフごとの処理時間、CPU時間、ピークメモリを記録する (デフォルトの出力先: {TRACE_DIR})")
     parser.add_argument("-un", "--username", help="Blueskyのハンドル名")
     parser.add_argument("-pw", "--password", help="Blueskyのパスワード")
     parser.add_argument("-url", "--reply_to_url", help="Blueskyの返信先URL")
-    return parser.parse_args()
+    return parser
 
-def main() -> None:
-    args = parse_arguments()
+def parse_arguments() -> argparse.Namespace:
+    return build_parser().parse_args()
 
-    if args.char1 not in CHARACTER_CONFIG or args.char2 not in CHARACTER_CONFIG:
+def load_dialogue(args: argparse.Namespace) -> Tuple[str, str, List[Tuple[str, str]]]:
+    characters = load_characters()
+    if args.char1 not in characters or args.char2 not in characters:
         print("指定されたキャラクターが存在しません。デフォルトのキャラクターを使用します。")
         args.char1, args.char2 = "ずんだもん", "四国めたん"
 
     title = ""
     atmosphere = ""
     dialogue: List[Tuple[str, str]] = []
-    scenario_generator = ScenarioGenerator()
 
     if args.url_or_file.endswith('.txt'):
         try:
@@ -209,37 +365,78 @@ def main() -> None:
                     dialogue.append((speaker.strip(), text.strip()))
         except ValueError:
             print("シナリオを生成します。")
-            log_parameters(args)
-            scenario = scenario_generator.generate_scenario(args.url_or_file, args.char1, args.char2, args.mode)
+            scenario = generate_scenario(args)
             title, atmosphere, dialogue = process_scenario(scenario, title, atmosphere, dialogue)
     else:
-        log_parameters(args)
-        scenario = scenario_generator.generate_scenario(args.url_or_file, args.char1, args.char2, args.mode)
+        scenario = generate_scenario(args)
         title, atmosphere, dialogue = process_scenario(scenario, title, atmosphere, dialogue)
+    return title, atmosphere, dialogue
 
-    clean_output_directory(OUTPUT_DIR)
-
-    audio_files, video_files = create_dialogue_files(dialogue, args.vertical, title)
-
-    bgm_file = Path(args.bgm) if args.bgm else select_bgm(atmosphere)
-
-    if bgm_file.suffix == '.bin':
-        bgm_file = Path(decode_bgm(bgm_file))
-
-    combine_dialogue_clips(video_files, audio_files, FINAL_OUTPUT, bgm_file, args.vertical)
-
-    if bgm_file.suffix == '.mp3' and bgm_file.parent == tempfile.gettempdir():
-        bgm_file.unlink()
-
-    print(f"対話動画が完成しました: {FINAL_OUTPUT}")
-
-    if args.username and args.password:
-        from bluesky_utils import post
-        text = f" {title}\n\n対話: {args.char1} x {args.char2}\n"
-        if args.reply_to_url:
-            post(args.username, args.password, text, args.reply_to_url)
+def create_video(args: argparse.Namespace, render_pool: Optional[Executor] = None, work_dir: Path = OUTPUT_DIR,
+                 cancel_event: Optional[threading.Event] = None) -> Tuple[str, Dict[bool, Path]]:
+    with pin_run_artifacts():
+        with span("load_dialogue"):
+            title, atmosphere, dialogue = load_dialogue(args)
+        check_cancelled(cancel_event)
+        work_dir.mkdir(parents=True, exist_ok=True)
+
+        with span("select_bgm"):
+            bgm_track = select_bgm(args.bgm, atmosphere)
+        print(f"BGM: {bgm_track.name}")
+
+        orientations = [False, True] if args.both else [args.vertical]
+        output_files = get_output_files(orientations, args.draft, args.output)
+        for output_file in output_files.values():
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+
+        if args.renderer == "ffmpeg":
+            with span("synthesize", lines=len(dialogue)):
+                line_audio = create_audio_files(dialogue, max_workers=args.jobs, work_dir=work_dir, cancel_event=cancel_event)
+            with span("render", renderer="ffmpeg"):
+                render_with_ffmpeg(dialogue, line_audio, title, output_files, bgm_track, duck_bgm=args.duck, draft=args.draft,
+                                   work_dir=work_dir, cancel_event=cancel_event)
         else:
-            post(args.username, args.password, text)
+            with span("synthesize_and_render_clips", lines=len(dialogue)):
+                line_audio, video_files = create_dialogue_files(dialogue, orientations, title, max_workers=args.jobs,
+                                                                render_workers=args.render_workers, draft=args.draft,
+                                                                render_pool=render_pool, work_dir=work_dir, cancel_event=cancel_event)
+            with span("combine", renderer="moviepy"):
+                combine_all(video_files, line_audio, output_files, bgm_track, duck_bgm=args.duck, draft=args.draft,
+                            render_pool=render_pool, work_dir=work_dir, cancel_event=cancel_event)
+
+        print_build_stats()
+        for output_file in output_files.values():
+            print(f"対話動画が完成しました: {output_file}")
+        return title, output_files
+
+def main() -> None:
+    if "--profile-startup" in sys.argv[1:]:
+        sys.exit(profile_startup(sys.argv[1:]))
+    args = parse_arguments()
+    set_cache_enabled(not args.no_cache)
+    tracer = enable_tracing() if args.trace else None
+    if args.clean:
+        clean_output_directory(OUTPUT_DIR)
+
+    try:
+        title, output_files = create_video(args)
+
+        if args.draft:
+            print("ドラフトのため、Blueskyへの投稿は行いません。")
+        elif args.username and args.password:
+            from bluesky_utils import post
+            text = f" {title}\n\n対話: {args.char1} x {args.char2}\n"
+            video_file = str(next(iter(output_files.values())))
+            with span("upload"):
+                if args.reply_to_url:
+                    post(args.username, args.password, text, args.reply_to_url, video_file=video_file)
+                else:
+                    post(args.username, args.password, text, video_file=video_file)
+    finally:
+        if tracer is not None:
+            tracer.print_summary()
+            trace_file, summary_file = tracer.save(Path(args.trace))
+            print(f"トレースを保存しました: {trace_file} (chrome://tracing で表示), {summary_file}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,204 @@
+import os
+import json
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+CACHE_DIR = Path(os.getenv('VOICEVOX_CACHE_DIR', 'cache'))
+AUDIO_CACHE_MAX_MB = int(os.getenv('VOICEVOX_CACHE_MAX_MB', 512))
+QUERY_CACHE_MAX_MB = int(os.getenv('VOICEVOX_QUERY_CACHE_MAX_MB', 64))
+BUILD_CACHE_DIR = Path(os.getenv('BUILD_CACHE_DIR', 'tmp/build'))
+BUILD_CACHE_MAX_MB = int(os.getenv('BUILD_CACHE_MAX_MB', 2048))
+ARTIFACT_SUFFIXES = {"processed": ".wav", "clip": ".mp4", "mix": ".wav"}
+STALE_PARTIAL_SECONDS = 3600
+
+_run_pins: ContextVar[Optional[List[Tuple["DiskCache", str]]]] = ContextVar("run_pins", default=None)
+
+def make_key(**fields: Any) -> str:
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class DiskCache:
+    def __init__(self, directory: Path, max_bytes: int, suffix: str = ".bin"):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+        self._pins: Counter = Counter()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{self.suffix}"
+
+    def _load_entries(self) -> "OrderedDict[str, int]":
+        if self._entries is None:
+            files = [f for f in self.directory.glob(f"*/*{self.suffix}") if '.' not in f.stem] if self.directory.exists() else []
+            stats = sorted(((f.stat().st_mtime, f.stem, f.stat().st_size) for f in files))
+            self._entries = OrderedDict((key, size) for _, key, size in stats)
+            self._total_bytes = sum(self._entries.values())
+        return self._entries
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        return data if self._touch(key, path) else None
+
+    def lookup(self, key: str) -> Optional[Path]:
+        path = self._path(key)
+        if not path.exists():
+            with self._lock:
+                self.misses += 1
+            return None
+        return path if self._touch(key, path) else None
+
+    def _touch(self, key: str, path: Path) -> bool:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                self._forget(self._load_entries(), key)
+            return False
+
+        with self._lock:
+            self.hits += 1
+            entries = self._load_entries()
+            if key in entries:
+                entries.move_to_end(key)
+            self._pin(key)
+        return True
+
+    def _forget(self, entries: "OrderedDict[str, int]", key: str) -> None:
+        self._total_bytes -= entries.pop(key, 0)
+
+    def _pin(self, key: str) -> None:
+        pins = _run_pins.get()
+        if pins is not None:
+            self._pins[key] += 1
+            pins.append((self, key))
+
+    def unpin(self, key: str) -> None:
+        with self._lock:
+            self._pins[key] -= 1
+            if self._pins[key] <= 0:
+                del self._pins[key]
+
+    def partial_path(self, key: str) -> Path:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.partial{self.suffix}")
+
+    def commit(self, key: str, partial_path: Path) -> Path:
+        path = self._path(key)
+        os.replace(partial_path, path)
+        size = path.stat().st_size
+
+        with self._lock:
+            entries = self._load_entries()
+            self._forget(entries, key)
+            self._total_bytes += size
+            entries[key] = size
+            self._pin(key)
+            self._evict(entries)
+        return path
+
+    def put(self, key: str, data: bytes) -> None:
+        partial_path = self.partial_path(key)
+        partial_path.write_bytes(data)
+        self.commit(key, partial_path)
+
+    def evict(self) -> None:
+        with self._lock:
+            self._evict(self._load_entries())
+
+    def _evict(self, entries: "OrderedDict[str, int]") -> None:
+        for key in list(entries):
+            if self._total_bytes <= self.max_bytes or len(entries) <= 1:
+                break
+            if key in self._pins:
+                continue
+            self._forget(entries, key)
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+        self._sweep_partials()
+
+    def _sweep_partials(self) -> None:
+        stale_before = time.time() - STALE_PARTIAL_SECONDS
+        for partial_path in self.directory.glob(f"*/*.partial{self.suffix}"):
+            try:
+                if partial_path.stat().st_mtime < stale_before:
+                    partial_path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"ヒット {self.hits} / ミス {self.misses} (ヒット率 {rate:.1f}%)"
+
+@contextmanager
+def pin_run_artifacts() -> Iterator[None]:
+    pins: List[Tuple[DiskCache, str]] = []
+    token = _run_pins.set(pins)
+    try:
+        yield
+    finally:
+        _run_pins.reset(token)
+        for cache, key in pins:
+            cache.unpin(key)
+        for cache in {cache for cache, _ in pins}:
+            cache.evict()
+
+_audio_cache: Optional[DiskCache] = None
+_query_cache: Optional[DiskCache] = None
+_artifact_caches: Dict[str, DiskCache] = {}
+_cache_enabled = os.getenv('VOICEVOX_CACHE', '1') != '0'
+_artifacts_enabled = os.getenv('BUILD_CACHE', '1') != '0'
+_cache_lock = threading.Lock()
+
+def set_cache_enabled(enabled: bool) -> None:
+    global _cache_enabled
+    _cache_enabled = enabled
+
+def get_audio_cache() -> Optional[DiskCache]:
+    global _audio_cache
+    if not _cache_enabled:
+        return None
+    with _cache_lock:
+        if _audio_cache is None:
+            _audio_cache = DiskCache(CACHE_DIR / 'audio', AUDIO_CACHE_MAX_MB * 1024 * 1024, suffix=".wav")
+        return _audio_cache
+
+def get_query_cache() -> Optional[DiskCache]:
+    global _query_cache
+    if not _cache_enabled:
+        return None
+    with _cache_lock:
+        if _query_cache is None:
+            _query_cache = DiskCache(CACHE_DIR / 'query', QUERY_CACHE_MAX_MB * 1024 * 1024, suffix=".json")
+        return _query_cache
+
+def get_artifact_cache(stage: str) -> Optional[DiskCache]:
+    if not _artifacts_enabled:
+        return None
+    with _cache_lock:
+        if stage not in _artifact_caches:
+            _artifact_caches[stage] = DiskCache(BUILD_CACHE_DIR / stage, BUILD_CACHE_MAX_MB * 1024 * 1024,
+                                                suffix=ARTIFACT_SUFFIXES[stage])
+        return _artifact_caches[stage]
@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / 'benchmarks'))
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from audio_processing import AudioProcessor
+from bench_audio_processor import SAMPLE_RATE, make_clip
+
+def stream(processor: AudioProcessor, clip: np.ndarray, chunk_size: int, gain: float = 1.0) -> np.ndarray:
+    chunks = [clip[i:i + chunk_size] for i in range(0, len(clip), chunk_size)]
+    return np.concatenate(list(processor.process_stream(chunks, SAMPLE_RATE, gain=gain)))
+
+@pytest.mark.parametrize("seconds", [0.05, 1, 5])
+@pytest.mark.parametrize("chunk_size", [100, 4096, 1 << 20])
+def test_process_stream_matches_process_up_to_gain(seconds, chunk_size):
+    processor = AudioProcessor()
+    clip = make_clip(seconds, 1)
+    expected = processor.process(clip, SAMPLE_RATE)
+
+    unscaled = stream(processor, clip, chunk_size)
+    peak = np.abs(unscaled.astype(np.float64)).max() / (processor.limit_threshold * 32767)
+    result = stream(processor, clip, chunk_size, gain=1 / peak)
+
+    assert len(result) == len(expected)
+    assert np.abs(result.astype(np.int32) - expected.astype(np.int32)).max() <= 4
@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+pytest.importorskip("emoji")
+
+from audio_mixer import LEAD_SILENCE, TAIL_SILENCE
+from ffmpeg_utils import get_ffmpeg_exe, run_ffmpeg
+
+try:
+    get_ffmpeg_exe()
+except FileNotFoundError:
+    pytest.skip("ffmpegが見つかりません", allow_module_level=True)
+
+from ffmpeg_renderer import frame_durations, render_dialogue_video
+from generate_movie import find_font, get_render_profile
+
+try:
+    find_font()
+except FileNotFoundError:
+    pytest.skip("日本語フォントが見つかりません", allow_module_level=True)
+
+DIALOGUE = [
+    ("ずんだもん", "今日はいい天気なのだ。"),
+    ("四国めたん", "そうね、散歩にでも行きましょうか。"),
+    ("ずんだもん", "賛成なのだ！"),
+]
+LINE_DURATIONS = [2.0, 2.5, 1.79]
+
+def count_frames(video_file: Path) -> int:
+    output = run_ffmpeg(["-i", str(video_file), "-map", "0:v", "-f", "framemd5", "-"]).decode("utf-8")
+    return sum(1 for line in output.splitlines() if line and not line.startswith("#"))
+
+@pytest.mark.parametrize("draft", [False, True])
+def test_render_dialogue_video_covers_padding(tmp_path, draft):
+    fps = get_render_profile(draft).fps
+    durations = frame_durations(LINE_DURATIONS)
+    total = LEAD_SILENCE + sum(durations) + TAIL_SILENCE
+
+    audio_file = tmp_path / "mix.wav"
+    run_ffmpeg(["-f", "lavfi", "-i", "anullsrc=r=44100:cl=stereo", "-t", f"{total:.6f}", str(audio_file)])
+    output_file = tmp_path / "output.mp4"
+    animation_types = ["fade", "slide_right", "slide_bottom"]
+
+    render_dialogue_video(DIALOGUE, durations, animation_types, "", False, audio_file, output_file, tmp_path, draft=draft)
+
+    assert count_frames(output_file) == round(total * fps)
@@ -0,0 +1,55 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / 'benchmarks'))
+
+pytest.importorskip("numpy")
+pytest.importorskip("emoji")
+
+import generate_voice
+import synthesis_cache
+from voicevox_client import VoicevoxClient
+from voicevox_stub import StubServer
+
+LINES = [
+    ("ずんだもん", "計測するのだ😊"),
+    ("四国めたん", "結果はどうだったの？🤔"),
+    ("ずんだもん", "速くなったのだ🎉、すごいのだ。"),
+    ("四国めたん", "それは良かったわね👍"),
+]
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    monkeypatch.setattr(synthesis_cache, "_cache_enabled", False)
+    for name in [name for name in sys.modules if name == "emoji" or name.startswith("emoji.")]:
+        monkeypatch.delitem(sys.modules, name)
+    with StubServer() as server:
+        client = VoicevoxClient(f"http://{server.address}")
+        monkeypatch.setattr(generate_voice, "get_client", lambda: client)
+        yield server
+        client.close()
+
+def test_synthesize_many_strips_emoji_across_threads(stub):
+    barrier = threading.Barrier(8)
+    results = {}
+
+    def run(worker):
+        barrier.wait()
+        results[worker] = generate_voice.synthesize_many(LINES, max_workers=4)
+
+    threads = [threading.Thread(target=run, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(audio, bytes) for audio_list in results.values() for audio in audio_list)
+    texts = {params["text"] for path, params in stub.received if path == "/audio_query"}
+    assert texts == {generate_voice.normalize_text(text) for _, text in LINES}
+    assert not any(char in text for text in texts for char in "😊🤔🎉👍")
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+from audio_processing import LineAudio
+from ffmpeg_renderer import frame_durations
+from generate_movie import get_render_profile
+from main import clip_duration
+
+SAMPLE_RATE = 24000
+
+def make_line_audio(durations):
+    return [LineAudio(np.zeros(int(duration * SAMPLE_RATE), dtype=np.int16), SAMPLE_RATE) for duration in durations]
+
+@pytest.mark.parametrize("draft", [False, True])
+def test_clip_durations_follow_final_grid(draft):
+    line_audio = make_line_audio(np.random.default_rng(0).uniform(1.0, 6.0, 40))
+    fps = get_render_profile(draft).fps
+    expected = np.cumsum(frame_durations([audio.duration for audio in line_audio]))
+
+    clips = np.cumsum([clip_duration(line_audio, index, fps) for index in range(len(line_audio))])
+
+    assert np.all(np.abs(clips - expected) <= 0.5 / fps + 1e-9)
+    if not draft:
+        assert np.allclose(clips, expected)
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from synthesis_cache import STALE_PARTIAL_SECONDS, DiskCache, make_key, pin_run_artifacts
+
+def commit_bytes(cache: DiskCache, key: str, data: bytes) -> Path:
+    partial_path = cache.partial_path(key)
+    partial_path.write_bytes(data)
+    return cache.commit(key, partial_path)
+
+def test_eviction_keeps_files_used_by_a_run(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=250, suffix=".bin")
+    keys = [make_key(index=i) for i in range(4)]
+
+    with pin_run_artifacts():
+        paths = [commit_bytes(cache, key, b"x" * 100) for key in keys]
+        assert all(path.exists() for path in paths)
+
+    assert [path.exists() for path in paths] == [False, False, True, True]
+
+def test_eviction_keeps_looked_up_files_until_the_run_ends(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=250, suffix=".bin")
+    old_key, new_key = make_key(index=0), make_key(index=1)
+    commit_bytes(cache, old_key, b"x" * 100)
+    commit_bytes(cache, new_key, b"x" * 100)
+
+    with pin_run_artifacts():
+        old_path = cache.lookup(old_key)
+        cache.lookup(new_key)
+        for i in range(2, 4):
+            commit_bytes(cache, make_key(index=i), b"x" * 100)
+        assert old_path.exists()
+
+def test_stale_partials_are_swept(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=1000, suffix=".bin")
+    stale = cache.partial_path(make_key(index=0))
+    stale.write_bytes(b"x")
+    old = time.time() - STALE_PARTIAL_SECONDS - 1
+    os.utime(stale, (old, old))
+    fresh = cache.partial_path(make_key(index=1))
+    fresh.write_bytes(b"x")
+
+    cache.evict()
+
+    assert not stale.exists()
+    assert fresh.exists()
+
+def test_entry_removed_before_touch_is_a_miss(tmp_path, monkeypatch):
+    cache = DiskCache(tmp_path, max_bytes=1000, suffix=".bin")
+    key = make_key(index=0)
+    path = commit_bytes(cache, key, b"x")
+
+    def evicted_by_another_process(target, *args):
+        Path(target).unlink()
+        raise FileNotFoundError(target)
+
+    monkeypatch.setattr(os, "utime", evicted_by_another_process)
+    assert cache.lookup(key) is None
+    assert not path.exists()
+    assert cache.misses == 1 and cache.hits == 0
@@ -0,0 +1,49 @@
+import socket
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / 'benchmarks'))
+
+pytest.importorskip("numpy")
+
+from voicevox_client import VoicevoxClient
+from voicevox_stub import StubServer
+
+def dead_address() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"127.0.0.1:{sock.getsockname()[1]}"
+
+def run_queries(client: VoicevoxClient, count: int):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        return list(executor.map(lambda i: client.audio_query(f"テスト{i}です。", 1), range(count)))
+
+def query_count(stub: StubServer) -> int:
+    return sum(1 for path, _ in stub.received if path == "/audio_query")
+
+def test_requests_spread_across_engines_and_fail_over():
+    with StubServer(latency=0.02) as first, StubServer(latency=0.02) as second:
+        client = VoicevoxClient([f"http://{first.address}", f"http://{second.address}", f"http://{dead_address()}"])
+        try:
+            healthy = client.check_health()
+            assert [node.base_url for node in healthy] == [f"http://{first.address}", f"http://{second.address}"]
+
+            results = run_queries(client, 40)
+            assert all(isinstance(result, dict) for result in results)
+            assert query_count(first) > 0 and query_count(second) > 0
+            assert query_count(first) + query_count(second) == 40
+
+            first.server.shutdown()
+            first.server.server_close()
+            before = query_count(second)
+            results = run_queries(client, 20)
+            assert all(isinstance(result, dict) for result in results)
+            assert query_count(second) - before == 20
+            assert not client.nodes[0].healthy
+        finally:
+            client.close()
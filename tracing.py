@@ -0,0 +1,168 @@
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+TRACE_DIR = Path('output/trace')
+TRACE_FILE = 'trace.json'
+SUMMARY_FILE = 'trace_summary.json'
+RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+def peak_rss() -> int:
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT
+
+def make_event(name: str, category: str, args: Dict[str, Any], start: float, cpu: float, process_cpu: float) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "cat": category,
+        "start": start,
+        "wall": time.perf_counter() - start,
+        "cpu": time.thread_time() - cpu,
+        "process_cpu": time.process_time() - process_cpu,
+        "peak_rss": peak_rss(),
+        "pid": os.getpid(),
+        "tid": threading.get_ident(),
+        "args": args,
+    }
+
+def measure(name: str, category: str, args: Dict[str, Any], func: Callable, *func_args, **func_kwargs) -> Tuple[Any, Dict[str, Any]]:
+    start, cpu, process_cpu = time.perf_counter(), time.thread_time(), time.process_time()
+    result = func(*func_args, **func_kwargs)
+    return result, make_event(name, category, args, start, cpu, process_cpu)
+
+class Tracer:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, category: str = "stage", **args) -> Iterator[None]:
+        start, cpu, process_cpu = time.perf_counter(), time.thread_time(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add(make_event(name, category, args, start, cpu, process_cpu))
+
+    def trace_events(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            events = sorted(self.events, key=lambda event: event["start"])
+        return [{
+            "name": event["name"],
+            "cat": event["cat"],
+            "ph": "X",
+            "ts": round((event["start"] - self.origin) * 1e6),
+            "dur": round(event["wall"] * 1e6),
+            "pid": event["pid"],
+            "tid": event["tid"],
+            "args": dict(event["args"], cpu_ms=round(event["cpu"] * 1000, 3),
+                         peak_rss_mb=round(event["peak_rss"] / 2**20, 1)),
+        } for event in events]
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            events = sorted(self.events, key=lambda event: event["start"])
+
+        spans: Dict[str, Dict[str, Any]] = {}
+        for event in events:
+            entry = spans.setdefault(event["name"], {"category": event["cat"], "count": 0, "wall": 0.0, "wall_max": 0.0,
+                                                     "cpu": 0.0, "peak_rss_mb": 0.0})
+            entry["count"] += 1
+            entry["wall"] += event["wall"]
+            entry["wall_max"] = max(entry["wall_max"], event["wall"])
+            entry["cpu"] += event["cpu"]
+            entry["peak_rss_mb"] = max(entry["peak_rss_mb"], event["peak_rss"] / 2**20)
+
+        stages = [{"name": event["name"], "wall": event["wall"], "cpu": event["process_cpu"],
+                   "peak_rss_mb": event["peak_rss"] / 2**20, **event["args"]}
+                  for event in events if event["cat"] == "stage" and event["pid"] == os.getpid()]
+        return {"wall": time.perf_counter() - self.origin, "peak_rss_mb": peak_rss() / 2**20, "stages": stages, "spans": spans}
+
+    def save(self, directory: Path = TRACE_DIR) -> Tuple[Path, Path]:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        trace_file, summary_file = directory / TRACE_FILE, directory / SUMMARY_FILE
+        with trace_file.open('w', encoding='utf-8') as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        with summary_file.open('w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        return trace_file, summary_file
+
+    def print_summary(self) -> None:
+        summary = self.summary()
+        print("\n処理時間の内訳:")
+        for stage in summary["stages"]:
+            print(f"{stage['name']:<24} {stage['wall']:8.2f}秒  CPU {stage['cpu']:8.2f}秒  ピークRSS {stage['peak_rss_mb']:8.1f}MB")
+        print(f"{'合計':<24} {summary['wall']:8.2f}秒  ピークRSS {summary['peak_rss_mb']:8.1f}MB")
+
+class TracedFuture(Future):
+    def __init__(self, inner: Future):
+        super().__init__()
+        self.inner = inner
+
+    def cancel(self) -> bool:
+        return self.inner.cancel()
+
+_tracer: Optional[Tracer] = None
+_disabled = nullcontext()
+
+def enable_tracing() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+def span(name: str, category: str = "stage", **args):
+    if _tracer is None:
+        return _disabled
+    return _tracer.span(name, category, **args)
+
+def traced(func: Callable, name: str, category: str = "line", **args) -> Callable:
+    tracer = _tracer
+    if tracer is None:
+        return func
+
+    def wrapper(*func_args, **func_kwargs):
+        with tracer.span(name, category, **args):
+            return func(*func_args, **func_kwargs)
+    return wrapper
+
+def submit_traced(executor: Executor, name: str, category: str, args: Dict[str, Any], func: Callable, *func_args, **func_kwargs) -> Future:
+    tracer = _tracer
+    if tracer is None:
+        return executor.submit(func, *func_args, **func_kwargs)
+
+    outer = TracedFuture(executor.submit(measure, name, category, args, func, *func_args, **func_kwargs))
+
+    def forward(future: Future) -> None:
+        if future.cancelled():
+            Future.cancel(outer)
+            outer.set_running_or_notify_cancel()
+        elif future.exception() is not None:
+            outer.set_exception(future.exception())
+        else:
+            result, event = future.result()
+            tracer.add(event)
+            outer.set_result(result)
+
+    outer.inner.add_done_callback(forward)
+    return outer
@@ -1,5 +1,6 @@
 import requests
 import os
+import sys
 
 def read_user_dict(file_path):
     words = []
@@ -13,10 +14,12 @@ def read_user_dict(file_path):
             })
     return words
 
-def register_user_dict(word):
-    voicevox_api_host = os.getenv('VOICEVOX_API_HOST', 'localhost')
-    base_url = f"http://{voicevox_api_host}:50021"
-    
+def get_base_urls():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from voicevox_client import get_engine_urls
+    return get_engine_urls()
+
+def register_user_dict(word, base_url):
     response = requests.post(
         f"{base_url}/user_dict_word",
         params={
@@ -32,12 +35,14 @@ def main():
     user_dict_file = 'user_dict/user_dict.txt'
     words = read_user_dict(user_dict_file)
 
-    for word in words:
-        try:
-            result = register_user_dict(word)
-            print(f"Registered: {word['surface']} - {result}")
-        except requests.RequestException as e:
-            print(f"Error registering {word['surface']}: {e}")
+    for base_url in get_base_urls():
+        print(f"Engine: {base_url}")
+        for word in words:
+            try:
+                result = register_user_dict(word, base_url)
+                print(f"Registered: {word['surface']} - {result}")
+            except requests.RequestException as e:
+                print(f"Error registering {word['surface']}: {e}")
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,14 @@
 import os
+import json
+from functools import lru_cache
 
 API_KEY_FILE = '.gemini_api_key'
+CHARACTERS_FILE = 'config/characters.json'
+
+@lru_cache(maxsize=None)
+def load_characters() -> dict:
+    with open(CHARACTERS_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 class APIKeyManager:
     @staticmethod
@@ -21,6 +29,8 @@ class GeminiHandler:
 
     @classmethod
     def initialize(cls, api_key: str):
+        if cls.model is not None:
+            return
         import google.generativeai as genai
         genai.configure(api_key=api_key)
         cls.model = genai.GenerativeModel(model_name="gemini-2.0-pro-exp-02-05")
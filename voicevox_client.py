@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+VOICEVOX_PORT = 50021
+POOL_SIZE = 16
+REQUEST_TIMEOUT = 120
+HEALTH_CHECK_TIMEOUT = 5
+HEALTH_CHECK_BACKOFF = 30
+LATENCY_SMOOTHING = 0.3
+DEFAULT_CONCURRENCY = 4
+
+def normalize_engine_url(endpoint: str) -> str:
+    endpoint = endpoint.strip().rstrip('/')
+    if not endpoint.startswith(("http://", "https://")):
+        endpoint = f"http://{endpoint}"
+    host_part = endpoint.split("://", 1)[1]
+    if ':' not in host_part:
+        endpoint = f"{endpoint}:{VOICEVOX_PORT}"
+    return endpoint
+
+def get_engine_urls() -> List[str]:
+    endpoints = os.getenv('VOICEVOX_API_HOSTS') or os.getenv('VOICEVOX_API_HOST', 'localhost')
+    urls = [normalize_engine_url(endpoint) for endpoint in endpoints.split(',') if endpoint.strip()]
+    if not urls:
+        raise ValueError("VOICEVOX_API_HOST environment variable is not set.")
+    return urls
+
+class EngineNode:
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.healthy = True
+        self.in_flight = 0
+        self.latency = 1.0
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def score(self) -> float:
+        return (self.in_flight + 1) * self.latency
+
+    def record_success(self, elapsed: float) -> None:
+        self.latency = (1 - LATENCY_SMOOTHING) * self.latency + LATENCY_SMOOTHING * elapsed
+        self.failures = 0
+        self.healthy = True
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.healthy = False
+        self.retry_at = time.monotonic() + HEALTH_CHECK_BACKOFF * min(self.failures, 4)
+
+class VoicevoxClient:
+    def __init__(self, base_urls: Union[str, Sequence[str]], pool_size: int = POOL_SIZE, timeout: float = REQUEST_TIMEOUT):
+        if isinstance(base_urls, str):
+            base_urls = [base_urls]
+        self.nodes = [EngineNode(url.rstrip('/')) for url in base_urls]
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.nodes), pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._user_dict_hash: Optional[str] = None
+
+    def check_health(self) -> List[EngineNode]:
+        for node in self.nodes:
+            self._probe(node)
+        return [node for node in self.nodes if node.healthy]
+
+    def _probe(self, node: EngineNode) -> bool:
+        start = time.monotonic()
+        try:
+            response = self.session.get(f"{node.base_url}/version", timeout=HEALTH_CHECK_TIMEOUT)
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            with self._lock:
+                node.record_failure()
+            return False
+        with self._lock:
+            node.record_success(time.monotonic() - start)
+        return True
+
+    def _select_node(self, exclude: List[EngineNode]) -> Optional[EngineNode]:
+        now = time.monotonic()
+        with self._lock:
+            candidates = [node for node in self.nodes if node not in exclude and node.healthy]
+            recovering = [node for node in self.nodes if node not in exclude and not node.healthy and node.retry_at <= now]
+            if not candidates and not recovering:
+                candidates = [node for node in self.nodes if node not in exclude]
+
+        for node in recovering:
+            if self._probe(node):
+                candidates.append(node)
+
+        if not candidates:
+            return None
+        with self._lock:
+            node = min(candidates, key=EngineNode.score)
+            node.in_flight += 1
+        return node
+
+    def request(self, path: str, method: str = "GET", **kwargs) -> Union[Dict[str, Any], bytes]:
+        tried: List[EngineNode] = []
+        last_error: Optional[Exception] = None
+
+        while len(tried) < len(self.nodes):
+            node = self._select_node(tried)
+            if node is None:
+                break
+            tried.append(node)
+
+            start = time.monotonic()
+            try:
+                response = self.session.request(method, f"{node.base_url}{path}", timeout=self.timeout, **kwargs)
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                with self._lock:
+                    node.in_flight -= 1
+                    if e.response is not None and e.response.status_code < 500:
+                        node.record_success(time.monotonic() - start)
+                        raise SystemExit(f"エラー: リクエスト中に問題が発生しました: {e}")
+                    node.record_failure()
+                last_error = e
+                print(f"VOICEVOXエンジン {node.base_url} でエラーが発生しました。別のエンジンで再試行します: {e}")
+                continue
+            except requests.exceptions.RequestException as e:
+                with self._lock:
+                    node.in_flight -= 1
+                    node.record_failure()
+                last_error = e
+                print(f"VOICEVOXエンジン {node.base_url} に接続できません。別のエンジンで再試行します: {e}")
+                continue
+
+            with self._lock:
+                node.in_flight -= 1
+                node.record_success(time.monotonic() - start)
+            return response.json() if response.headers.get('content-type') == 'application/json' else response.content
+
+        if last_error is None or isinstance(last_error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            raise SystemExit("エラー: VOICEVOXのDockerコンテナが起動しているか確認してください。")
+        raise SystemExit(f"エラー: リクエスト中に問題が発生しました: {last_error}")
+
+    def audio_query(self, text: str, speaker: int) -> Union[Dict[str, Any], bytes]:
+        return self.request("/audio_query", method="POST", params={"text": text, "speaker": speaker})
+
+    def synthesis(self, query: Dict[str, Any], speaker: int) -> Union[Dict[str, Any], bytes]:
+        return self.request(
+            "/synthesis",
+            method="POST",
+            params={"speaker": speaker},
+            data=json.dumps(query),
+            headers={"Content-Type": "application/json"}
+        )
+
+    def user_dict_hash(self) -> str:
+        if self._user_dict_hash is None:
+            user_dict = self.request("/user_dict")
+            payload = json.dumps(user_dict, sort_keys=True, ensure_ascii=False) if isinstance(user_dict, dict) else user_dict
+            digest = hashlib.sha256(payload.encode('utf-8') if isinstance(payload, str) else payload)
+            self._user_dict_hash = digest.hexdigest()
+        return self._user_dict_hash
+
+    def close(self) -> None:
+        self.session.close()
+
+_client: Optional[VoicevoxClient] = None
+_client_lock = threading.Lock()
+
+def get_client() -> VoicevoxClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = VoicevoxClient(get_engine_urls())
+            if len(_client.nodes) > 1:
+                healthy = _client.check_health()
+                print(f"VOICEVOXエンジン: {len(healthy)}/{len(_client.nodes)} 台が応答しています。")
+        return _client
+
+def get_concurrency() -> int:
+    return max(1, int(os.getenv('VOICEVOX_CONCURRENCY', DEFAULT_CONCURRENCY * len(get_engine_urls()))))